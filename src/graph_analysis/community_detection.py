@@ -3,13 +3,15 @@ Community detection module.
 Implements community detection algorithms for transport networks.
 """
 
+import os
 import networkx as nx
 import community as community_louvain
 import matplotlib.pyplot as plt
 import matplotlib.cm as cm
 import numpy as np
 from collections import defaultdict
-from typing import Dict, List, Tuple, Any
+from heapq import nlargest
+from typing import Dict, List, Tuple, Any, Optional
 import logging
 
 # Configure logging
@@ -17,6 +19,16 @@ logging.basicConfig(level=logging.INFO,
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+try:
+    import cudf
+    import cugraph
+    CUGRAPH_AVAILABLE = True
+except ImportError:
+    CUGRAPH_AVAILABLE = False
+
+# Louvain implementations accepted by detect_communities_louvain
+LOUVAIN_BACKENDS = ('nx', 'cugraph', 'python-louvain')
+
 class CommunityDetector:
     """Class for detecting and analyzing communities in transport networks."""
     
@@ -32,17 +44,46 @@ class CommunityDetector:
         self.community_nodes = None
         self.modularity = None
         
-    def detect_communities_louvain(self) -> Dict[Any, int]:
+    def detect_communities_louvain(self, backend: Optional[str] = None,
+                                   seed: Optional[int] = 42) -> Dict[Any, int]:
         """
         Detect communities using the Louvain method.
         
+        Args:
+            backend: Louvain implementation to use: 'nx' (NetworkX), 'cugraph'
+                     (GPU, falls back to 'nx' when unavailable) or
+                     'python-louvain'. Defaults to the LOUVAIN_BACKEND
+                     environment variable, or 'nx' if it is unset.
+            seed: Random seed for the node visiting order, so repeated runs give
+                  the same communities (None for a random order; cugraph
+                  takes no seed)
+        
         Returns:
             Dictionary mapping node IDs to community IDs
         """
-        logger.info("Detecting communities using Louvain method")
+        backend = backend or os.environ.get("LOUVAIN_BACKEND", "nx")
+        if backend not in LOUVAIN_BACKENDS:
+            raise ValueError(f"Unknown Louvain backend {backend!r}, expected one of {LOUVAIN_BACKENDS}")
+        if backend == 'cugraph' and not CUGRAPH_AVAILABLE:
+            logger.warning("cugraph is not installed, falling back to NetworkX Louvain")
+            backend = 'nx'
+        
+        logger.info(f"Detecting communities using Louvain method ({backend})")
         
         # Apply the Louvain method
-        self.partition = community_louvain.best_partition(self.graph)
+        if backend == 'nx':
+            communities = nx.community.louvain_communities(
+                self.graph, weight='weight', resolution=1, threshold=1e-7, seed=seed
+            )
+            self.partition = {
+                node: community_id
+                for community_id, nodes in enumerate(communities)
+                for node in nodes
+            }
+        elif backend == 'cugraph':
+            self.partition = self._louvain_cugraph()
+        else:
+            self.partition = community_louvain.best_partition(self.graph, random_state=seed)
         
         # Calculate modularity
         self.modularity = community_louvain.modularity(self.partition, self.graph)
@@ -62,6 +103,32 @@ class CommunityDetector:
         
         return self.partition
     
+    def _louvain_cugraph(self) -> Dict[Any, int]:
+        """
+        Run Louvain on the GPU with cugraph.
+        
+        Returns:
+            Dictionary mapping node IDs to community IDs
+        """
+        edges = cudf.DataFrame(
+            [(u, v, data.get('weight', 1.0)) for u, v, data in self.graph.edges(data=True)],
+            columns=['src', 'dst', 'weight']
+        )
+        gpu_graph = cugraph.Graph()
+        gpu_graph.from_cudf_edgelist(edges, source='src', destination='dst', edge_attr='weight', renumber=True)
+        
+        parts, _ = cugraph.louvain(gpu_graph, resolution=1.0, threshold=1e-7)
+        parts = parts.to_pandas()
+        partition = dict(zip(parts['vertex'], parts['partition'].astype(int)))
+        
+        # Isolated nodes have no edges to send to the GPU; give each its own community
+        next_id = max(partition.values(), default=-1) + 1
+        for node in self.graph.nodes():
+            if node not in partition:
+                partition[node] = next_id
+                next_id += 1
+        return partition
+    
     def visualize_communities(self, output_file: str = "transport_communities.png") -> None:
         """
         Visualize the detected communities.
@@ -118,15 +185,22 @@ class CommunityDetector:
         logger.info(f"Visualization saved to {output_file}")
         plt.close()
     
-    def analyze_communities(self) -> Dict:
+    def analyze_communities(self, top_n: Optional[int] = None, by: str = 'size') -> Dict:
         """
         Analyze the detected communities.
         
+        Args:
+            top_n: If given, only analyze this many communities, ranked by `by`
+                   (num_communities still counts every community)
+            by: Ranking used with top_n; only 'size' (node count) is supported
+            
         Returns:
             Dictionary with community analysis results
         """
         if self.partition is None:
             raise ValueError("Communities have not been detected yet")
+        if by != 'size':
+            raise ValueError(f"Unsupported ranking {by!r}, expected 'size'")
             
         logger.info("Analyzing communities")
         
@@ -136,8 +210,14 @@ class CommunityDetector:
             "communities": {}
         }
         
+        # Pick the largest communities from their node counts before doing
+        # any of the per-community subgraph work
+        selected = self.community_nodes.items()
+        if top_n is not None:
+            selected = nlargest(top_n, selected, key=lambda x: len(x[1]))
+        
         # Analyze each community
-        for community_id, nodes in self.community_nodes.items():
+        for community_id, nodes in selected:
             # Get subgraph for this community
             subgraph = self.graph.subgraph(nodes)
             
@@ -1,6 +1,7 @@
 """
 Advanced critical node analysis for transport networks with optimized performance.
 """
+import os
 import networkx as nx
 import numpy as np
 import pandas as pd
@@ -11,6 +12,19 @@ import functools
 
 logger = logging.getLogger(__name__)
 
+try:
+    import numba
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Centrality methods each optional native engine can compute
+NATIVE_CENTRALITY_METHODS = {
+    'igraph': {'betweenness', 'closeness', 'eigenvector'},
+    'rustworkx': {'betweenness', 'closeness', 'eigenvector'},
+}
+
 # Define worker function at the module level so it can be pickled
 def _vulnerability_worker(args):
     """Process a single node for vulnerability assessment - module level function for multiprocessing."""
@@ -23,12 +37,7 @@ def _vulnerability_worker(args):
     modified_metrics = _calculate_network_metrics_fast(G_view)
     
     # Calculate impact percentages
-    impact = {}
-    for metric in baseline_metrics:
-        if baseline_metrics[metric] == 0:
-            impact[f"{metric}_impact"] = 0
-        else:
-            impact[f"{metric}_impact"] = 100 * (1 - (modified_metrics[metric] / baseline_metrics[metric]))
+    impact = _metric_impact(baseline_metrics, modified_metrics)
     
     # Calculate community connectivity impact if partition is available
     community_impact = {}
@@ -44,6 +53,16 @@ def _vulnerability_worker(args):
         **community_impact
     }
 
+def _metric_impact(baseline_metrics: Dict[str, float], modified_metrics: Dict[str, float]) -> Dict[str, float]:
+    """Calculate the percentage drop of each metric relative to the baseline."""
+    impact = {}
+    for metric in baseline_metrics:
+        if baseline_metrics[metric] == 0:
+            impact[f"{metric}_impact"] = 0
+        else:
+            impact[f"{metric}_impact"] = 100 * (1 - (modified_metrics[metric] / baseline_metrics[metric]))
+    return impact
+
 def _calculate_network_metrics_fast(G: nx.Graph) -> Dict[str, float]:
     """
     Calculate key network metrics for a graph - optimized version.
@@ -148,20 +167,262 @@ def _assess_community_impact_fast(G: nx.Graph, node_id: Any, partition: Dict) ->
         'community_impact_score': len(disconnected_communities) / max(1, len(neighbor_communities))
     }
 
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _bfs_from(indptr, indices, removed, source, dist, queue):
+        """BFS over the CSR graph skipping `removed`; returns (distance sum, nodes reached)."""
+        dist[source] = 0
+        queue[0] = source
+        head, tail = 0, 1
+        total = 0
+        while head < tail:
+            u = queue[head]
+            head += 1
+            total += dist[u]
+            for j in range(indptr[u], indptr[u + 1]):
+                v = indices[j]
+                if v != removed and dist[v] == -1:
+                    dist[v] = dist[u] + 1
+                    queue[tail] = v
+                    tail += 1
+        
+        # Reset only the visited entries so the buffers can be reused
+        for i in range(tail):
+            dist[queue[i]] = -1
+        return total, tail
+    
+    @njit(cache=True)
+    def _vulnerability_kernel(indptr, indices, removed, comm, n_comm, trials):
+        """
+        Metrics for the graph with `removed` hidden, mirroring
+        _calculate_network_metrics_fast and _assess_community_impact_fast.
+        
+        Returns (largest_cc_size, avg_path_length, avg_clustering,
+        connected_communities, disconnected_communities).
+        """
+        n = len(indptr) - 1
+        label = np.full(n, -1, np.int64)
+        queue = np.empty(n, np.int64)
+        
+        # Label connected components and keep the first largest one
+        best_label, best_size, n_labels = -1, 0, 0
+        for s in range(n):
+            if s == removed or label[s] != -1:
+                continue
+            label[s] = n_labels
+            queue[0] = s
+            head, tail = 0, 1
+            while head < tail:
+                u = queue[head]
+                head += 1
+                for j in range(indptr[u], indptr[u + 1]):
+                    v = indices[j]
+                    if v != removed and label[v] == -1:
+                        label[v] = n_labels
+                        queue[tail] = v
+                        tail += 1
+            if tail > best_size:
+                best_label, best_size = n_labels, tail
+            n_labels += 1
+        
+        result = np.zeros(5)
+        if best_size > 0:
+            cc_nodes = np.flatnonzero(label == best_label)
+            dist = np.full(n, -1, np.int64)
+            
+            # Average path length: exact for small components, sampled otherwise
+            if best_size > 1000:
+                sources = np.random.choice(cc_nodes, min(100, best_size), replace=False)
+                total, count = 0, 0
+                for source in sources:
+                    t, c = _bfs_from(indptr, indices, removed, source, dist, queue)
+                    total += t
+                    count += c
+                apl = total / count if count > 0 else 0.0
+            elif best_size > 1:
+                total = 0
+                for source in cc_nodes:
+                    t, _ = _bfs_from(indptr, indices, removed, source, dist, queue)
+                    total += t
+                apl = total / (best_size * (best_size - 1))
+            else:
+                apl = 0.0
+            
+            # Approximate clustering: how often two random neighbours are linked
+            nbrs = np.empty(n, np.int64)
+            triangles = 0
+            for _ in range(trials):
+                u = cc_nodes[np.random.randint(best_size)]
+                k = 0
+                for j in range(indptr[u], indptr[u + 1]):
+                    if indices[j] != removed:
+                        nbrs[k] = indices[j]
+                        k += 1
+                if k < 2:
+                    continue
+                a = np.random.randint(k)
+                b = np.random.randint(k - 1)
+                if b >= a:
+                    b += 1
+                x, y = nbrs[a], nbrs[b]
+                for j in range(indptr[x], indptr[x + 1]):
+                    if indices[j] == y:
+                        triangles += 1
+                        break
+            
+            result[0] = best_size
+            result[1] = apl
+            result[2] = triangles / trials
+        
+        # Community impact (-1 marks nodes without a community)
+        if n_comm > 0:
+            node_comm = comm[removed]
+            neighbour = np.zeros(n_comm + 1, np.bool_)
+            for j in range(indptr[removed], indptr[removed + 1]):
+                c = comm[indices[j]]
+                if c != node_comm:
+                    neighbour[c if c >= 0 else n_comm] = True
+            
+            # Communities still linked to the node's community without it
+            linked = np.zeros(n_comm + 1, np.bool_)
+            if node_comm >= 0:
+                for u in range(n):
+                    if u == removed or comm[u] != node_comm:
+                        continue
+                    for j in range(indptr[u], indptr[u + 1]):
+                        c = comm[indices[j]]
+                        if c >= 0 and c != node_comm:
+                            linked[c] = True
+            
+            connected, disconnected = 0, 0
+            for c in range(n_comm + 1):
+                if neighbour[c]:
+                    connected += 1
+                    if not linked[c]:
+                        disconnected += 1
+            result[3] = connected
+            result[4] = disconnected
+        
+        return result
+    
+    @njit(parallel=True, cache=True)
+    def _vulnerability_batch(indptr, indices, removed_nodes, comm, n_comm, trials):
+        """Run _vulnerability_kernel for every removed node in parallel."""
+        out = np.zeros((len(removed_nodes), 5))
+        for r in prange(len(removed_nodes)):
+            out[r] = _vulnerability_kernel(indptr, indices, removed_nodes[r], comm, n_comm, trials)
+        return out
+
 class CriticalNodeAnalyzer:
     """Class for advanced analysis of critical nodes in transport networks."""
     
-    def __init__(self, graph: nx.Graph, partition: Dict = None):
+    def __init__(self, graph: nx.Graph, partition: Dict = None, engine: str = 'networkx'):
         """
         Initialize the critical node analyzer.
         
         Args:
             graph: NetworkX graph representing the transport network
             partition: Optional dictionary mapping node IDs to community IDs
+            engine: Centrality backend ('networkx', 'igraph' or 'rustworkx')
         """
-        self.graph = graph
-        self.partition = partition
+        if engine != 'networkx' and engine not in NATIVE_CENTRALITY_METHODS:
+            raise ValueError(f"Unknown centrality engine: {engine}")
+        
+        self.engine = engine
+        self._native_graph = None
         
+        # Work on an integer-labelled copy so node hashing and per-node lookups
+        # are cheap; original IDs are kept for reporting results
+        self.graph = nx.convert_node_labels_to_integers(graph, label_attribute='orig_id')
+        self._orig_ids = np.empty(self.graph.number_of_nodes(), dtype=object)
+        self._orig_ids[:] = list(graph.nodes())
+        self._node_index = {node: i for i, node in enumerate(self._orig_ids)}
+        
+        if partition:
+            self.partition = {self._node_index[node]: comm for node, comm in partition.items()
+                              if node in self._node_index}
+        else:
+            self.partition = partition
+    
+    def _to_internal(self, critical_nodes: List[Tuple[Any, float]]) -> List[Tuple[int, float]]:
+        """Map (node_id, score) pairs from original node IDs to internal integer labels."""
+        return [(self._node_index[node_id], score) for node_id, score in critical_nodes]
+    
+    def _restore_ids(self, results: List[Dict]) -> List[Dict]:
+        """Map integer node labels in vulnerability results back to original node IDs."""
+        for result in results:
+            node = result['node_id']
+            result['node_id'] = self._orig_ids[node]
+            result['name'] = self.graph.nodes[node].get('name', str(result['node_id']))
+        return results
+        
+    def _get_native_graph(self):
+        """Convert the graph to the configured native engine once and cache it."""
+        if self._native_graph is None:
+            # Integer labels 0..n-1 map directly onto native vertex indices
+            n = self.graph.number_of_nodes()
+            edges = list(self.graph.edges())
+            
+            if self.engine == 'igraph':
+                import igraph as ig
+                self._native_graph = ig.Graph(n=n, edges=edges, directed=False)
+            else:
+                import rustworkx as rx
+                self._native_graph = rx.PyGraph()
+                self._native_graph.add_nodes_from(range(n))
+                self._native_graph.add_edges_from_no_data(edges)
+            
+            logger.info(f"Converted graph to {self.engine} ({n} nodes, {len(edges)} edges)")
+        
+        return self._native_graph
+    
+    def _native_centrality(self, method: str) -> Dict[int, float]:
+        """
+        Calculate centrality with the native engine, scaled to match NetworkX.
+        
+        Args:
+            method: Centrality method supported by the engine
+            
+        Returns:
+            Dictionary mapping internal node labels to centrality scores
+        """
+        g = self._get_native_graph()
+        
+        if self.engine == 'rustworkx':
+            import rustworkx as rx
+            if method == 'betweenness':
+                scores = rx.betweenness_centrality(g, normalized=True, parallel_threshold=50)
+            elif method == 'closeness':
+                scores = rx.closeness_centrality(g, wf_improved=True)
+            else:
+                try:
+                    scores = rx.eigenvector_centrality(g, max_iter=1000, tol=1e-6)
+                except rx.FailedToConverge:
+                    # Power iteration can stall where the numpy eigensolver does not
+                    logger.warning("rustworkx eigenvector centrality did not converge, using NetworkX")
+                    return nx.eigenvector_centrality_numpy(self.graph)
+            return dict(scores.items())
+        
+        n = g.vcount()
+        if method == 'betweenness':
+            # igraph counts each undirected pair once and does not normalize
+            scale = 2 / ((n - 1) * (n - 2)) if n > 2 else 1
+            scores = [b * scale for b in g.betweenness(directed=False)]
+        elif method == 'closeness':
+            # Apply the Wasserman-Faust scaling NetworkX uses for disconnected graphs
+            membership = g.connected_components().membership
+            component_sizes = np.bincount(membership)
+            scores = [
+                0.0 if np.isnan(c) else c * (component_sizes[m] - 1) / max(1, n - 1)
+                for c, m in zip(g.closeness(normalized=True), membership)
+            ]
+        else:
+            # igraph scales the top score to 1, NetworkX to a unit vector
+            scores = np.asarray(g.eigenvector_centrality(scale=True))
+            scores = scores / np.linalg.norm(scores)
+        
+        return dict(enumerate(float(score) for score in scores))
+    
     def identify_critical_nodes(self, method: str = 'betweenness', top_n: int = 20, 
                                sample_size: int = None) -> List[Tuple[Any, float]]:
         """
@@ -178,7 +439,11 @@ class CriticalNodeAnalyzer:
         logger.info(f"Identifying critical nodes using {method} centrality")
         
         # Calculate centrality based on selected method
-        if method == 'betweenness':
+        if method in NATIVE_CENTRALITY_METHODS.get(self.engine, ()):
+            if method == 'betweenness' and sample_size:
+                logger.info(f"Computing exact betweenness with {self.engine}, ignoring sample_size")
+            centrality = self._native_centrality(method)
+        elif method == 'betweenness':
             if sample_size or self.graph.number_of_nodes() > 1000:
                 logger.info(f"Using approximate betweenness centrality with k={sample_size or 500}")
                 centrality = nx.betweenness_centrality(
@@ -203,7 +468,7 @@ class CriticalNodeAnalyzer:
         # Sort nodes by centrality score
         critical_nodes = sorted(centrality.items(), key=lambda x: x[1], reverse=True)[:top_n]
         
-        return critical_nodes
+        return [(self._orig_ids[node], score) for node, score in critical_nodes]
     
     def analyze_critical_nodes(self, critical_nodes: List[Tuple[Any, float]]) -> pd.DataFrame:
         """
@@ -217,18 +482,26 @@ class CriticalNodeAnalyzer:
         """
         logger.info(f"Analyzing {len(critical_nodes)} critical nodes")
         
+        internal_nodes = self._to_internal(critical_nodes)
+        
+        # Compute degree and clustering for all critical nodes in one pass each
+        node_ids = [node_id for node_id, _ in internal_nodes]
+        degree_map = dict(self.graph.degree(node_ids))
+        clustering_map = nx.clustering(self.graph, nodes=node_ids)
+        
         # Create DataFrame for analysis
         node_data = []
-        for node_id, score in critical_nodes:
+        for node_id, score in internal_nodes:
             # Get node data
             node_info = self.graph.nodes[node_id]
+            orig_id = self._orig_ids[node_id]
             
             # Basic data
             node_row = {
-                'node_id': node_id,
-                'name': node_info.get('name', str(node_id)),
+                'node_id': orig_id,
+                'name': node_info.get('name', str(orig_id)),
                 'centrality': score,
-                'degree': self.graph.degree[node_id],
+                'degree': degree_map[node_id],
                 'lat': node_info.get('lat'),
                 'lon': node_info.get('lon')
             }
@@ -237,8 +510,8 @@ class CriticalNodeAnalyzer:
             if self.partition:
                 node_row['community'] = self.partition.get(node_id)
             
-            # Calculate local clustering coefficient
-            node_row['clustering'] = nx.clustering(self.graph, node_id)
+            # Local clustering coefficient
+            node_row['clustering'] = clustering_map[node_id]
             
             # Get neighbor communities if partition is available
             if self.partition:
@@ -267,7 +540,8 @@ class CriticalNodeAnalyzer:
         return df
     
     def assess_vulnerability(self, critical_nodes: List[Tuple[Any, float]], 
-                             parallel: bool = True, max_workers: int = 4) -> List[Dict]:
+                             parallel: bool = True, max_workers: int = 4,
+                             engine: str = 'networkx') -> List[Dict]:
         """
         Assess network vulnerability by simulating removal of critical nodes.
         
@@ -275,6 +549,7 @@ class CriticalNodeAnalyzer:
             critical_nodes: List of tuples (node_id, centrality_score)
             parallel: Whether to use parallel processing
             max_workers: Number of parallel workers to use
+            engine: Simulation backend ('networkx' or 'numba' for the compiled kernel)
             
         Returns:
             List of dictionaries with vulnerability assessment
@@ -285,11 +560,25 @@ class CriticalNodeAnalyzer:
         baseline_metrics = _calculate_network_metrics_fast(self.graph)
         logger.info(f"Baseline network metrics: {baseline_metrics}")
         
-        # Use parallel or sequential processing based on parameter
-        if parallel and len(critical_nodes) > 1:
-            return self._assess_vulnerability_parallel(critical_nodes, baseline_metrics, max_workers)
+        if engine not in ('networkx', 'numba'):
+            raise ValueError(f"Unknown vulnerability engine: {engine}")
+        if engine == 'numba' and not NUMBA_AVAILABLE:
+            logger.warning("numba is not installed, falling back to networkx")
+            engine = 'networkx'
+        
+        # Use the compiled kernel if requested, otherwise parallel or
+        # sequential processing based on parameter
+        internal_nodes = self._to_internal(critical_nodes)
+        if engine == 'numba':
+            results = self._assess_vulnerability_numba(
+                internal_nodes, baseline_metrics, max_workers if parallel else 1
+            )
+        elif parallel and len(critical_nodes) > 1:
+            results = self._assess_vulnerability_parallel(internal_nodes, baseline_metrics, max_workers)
         else:
-            return self._assess_vulnerability_sequential(critical_nodes, baseline_metrics)
+            results = self._assess_vulnerability_sequential(internal_nodes, baseline_metrics)
+        
+        return self._restore_ids(results)
     
     def _assess_vulnerability_parallel(self, critical_nodes, baseline_metrics, max_workers):
         """Parallel implementation of vulnerability assessment."""
@@ -298,12 +587,88 @@ class CriticalNodeAnalyzer:
         for node_id, score in critical_nodes:
             worker_args.append((node_id, score, self.graph, self.partition, baseline_metrics))
         
+        # Send tasks in batches (about two per worker) to amortize IPC round-trips
+        chunksize = max(1, len(worker_args) // (max_workers * 2))
+        
         # Use a ProcessPoolExecutor to parallelize
         with ProcessPoolExecutor(max_workers=max_workers) as executor:
-            results = list(executor.map(_vulnerability_worker, worker_args))
+            results = list(executor.map(_vulnerability_worker, worker_args, chunksize=chunksize))
         
         return results
     
+    def _assess_vulnerability_numba(self, critical_nodes, baseline_metrics, max_workers):
+        """
+        Numba implementation of vulnerability assessment on the CSR adjacency.
+        
+        Unless NUMBA_THREADING_LAYER is set, the first call selects the
+        fork-safe workqueue threading layer for the process: with the default
+        tbb layer, forked process pools hang at exit once a parallel kernel
+        has run. Set the variable to choose a different layer.
+        """
+        n = self.graph.number_of_nodes()
+        m = self.graph.number_of_edges()
+        adjacency = nx.to_scipy_sparse_array(self.graph, nodelist=range(n), format='csr')
+        indptr = adjacency.indptr.astype(np.int64)
+        indices = adjacency.indices.astype(np.int64)
+        
+        # Dense community labels, -1 for nodes outside the partition
+        comm = np.full(n, -1, np.int64)
+        n_comm = 0
+        if self.partition:
+            comm_index = {c: i for i, c in enumerate(set(self.partition.values()))}
+            for node, c in self.partition.items():
+                comm[node] = comm_index[c]
+            n_comm = len(comm_index)
+        
+        removed_nodes = np.array([node_id for node_id, _ in critical_nodes], dtype=np.int64)
+        # Numba picks the threading layer at the first parallel launch, so
+        # this only takes effect before any parallel kernel has run
+        if 'NUMBA_THREADING_LAYER' not in os.environ:
+            numba.config.THREADING_LAYER = 'workqueue'
+        
+        # The thread count is process-wide, so put it back afterwards
+        previous_threads = numba.get_num_threads()
+        numba.set_num_threads(max(1, min(max_workers, numba.config.NUMBA_NUM_THREADS)))
+        try:
+            stats = _vulnerability_batch(indptr, indices, removed_nodes, comm, n_comm, 1000)
+        finally:
+            numba.set_num_threads(previous_threads)
+        
+        vulnerability_results = []
+        for (node_id, score), row in zip(critical_nodes, stats):
+            # Rebuild the metric dict the NetworkX path would produce
+            nodes = n - 1
+            edges = m - int(indptr[node_id + 1] - indptr[node_id])
+            cc_size = int(row[0])
+            modified_metrics = {
+                'nodes': nodes,
+                'edges': edges,
+                'density': 2 * edges / (nodes * (nodes - 1)) if nodes > 1 else 0,
+                'largest_cc_size': cc_size,
+                'largest_cc_ratio': cc_size / nodes if nodes > 0 else 0,
+                'avg_path_length': float(row[1]),
+                'avg_clustering': float(row[2])
+            }
+            
+            community_impact = {}
+            if self.partition:
+                connected, disconnected = int(row[3]), int(row[4])
+                community_impact = {
+                    'connected_communities': connected,
+                    'disconnected_communities': disconnected,
+                    'community_impact_score': disconnected / max(1, connected)
+                }
+            
+            vulnerability_results.append({
+                'node_id': node_id,
+                'name': self.graph.nodes[node_id].get('name', str(node_id)),
+                'centrality': score,
+                **_metric_impact(baseline_metrics, modified_metrics),
+                **community_impact
+            })
+        
+        return vulnerability_results
+    
     def _assess_vulnerability_sequential(self, critical_nodes, baseline_metrics):
         """Sequential implementation of vulnerability assessment."""
         vulnerability_results = []
@@ -316,12 +681,7 @@ class CriticalNodeAnalyzer:
             modified_metrics = _calculate_network_metrics_fast(G_view)
             
             # Calculate impact percentages
-            impact = {}
-            for metric in baseline_metrics:
-                if baseline_metrics[metric] == 0:
-                    impact[f"{metric}_impact"] = 0
-                else:
-                    impact[f"{metric}_impact"] = 100 * (1 - (modified_metrics[metric] / baseline_metrics[metric]))
+            impact = _metric_impact(baseline_metrics, modified_metrics)
             
             # Calculate community connectivity impact if partition is available
             community_impact = {}
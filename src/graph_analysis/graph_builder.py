@@ -26,13 +26,16 @@ class TransportGraphBuilder:
         self.gtfs_data = gtfs_data
         self.graph = nx.Graph()
         
-    def build_graph(self, sample_size: Optional[int] = None) -> nx.Graph:
+    def build_graph(self, sample_size: Optional[int] = None,
+                    seed: Optional[int] = None) -> nx.Graph:
         """
         Build a graph from GTFS data.
         
         Args:
             sample_size: Optional number of trips to sample for graph construction.
                          If None, all trips are used.
+            seed: Optional random seed for the trip sample, so the same trips
+                  are picked on every run
         
         Returns:
             NetworkX graph representing the transport network
@@ -45,15 +48,14 @@ class TransportGraphBuilder:
         trips_df = self.gtfs_data["trips"]
         stop_times_df = self.gtfs_data["stop_times"]
         
-        # Add stops as nodes
-        for _, stop in stops_df.iterrows():
-            self.graph.add_node(
-                stop['stop_id'], 
-                type='stop', 
-                name=stop['stop_name'],
-                lat=float(stop['stop_lat']),
-                lon=float(stop['stop_lon'])
-            )
+        # Add stops as nodes in bulk (float columns yield Python floats)
+        stop_rows = stops_df[['stop_id', 'stop_name', 'stop_lat', 'stop_lon']].astype(
+            {'stop_lat': float, 'stop_lon': float}
+        )
+        self.graph.add_nodes_from(
+            (stop_id, {'type': 'stop', 'name': name, 'lat': lat, 'lon': lon})
+            for stop_id, name, lat, lon in stop_rows.itertuples(index=False, name=None)
+        )
         
         logger.info(f"Added {len(stops_df)} stops as nodes")
         
@@ -61,7 +63,7 @@ class TransportGraphBuilder:
         # Sample trips if specified
         if sample_size is not None and sample_size < len(trips_df):
             logger.info(f"Sampling {sample_size} trips from {len(trips_df)} total trips")
-            sampled_trips_df = trips_df.sample(sample_size)
+            sampled_trips_df = trips_df.sample(sample_size, random_state=seed)
             trip_ids = sampled_trips_df['trip_id'].tolist()
         else:
             trip_ids = trips_df['trip_id'].tolist()
@@ -100,32 +100,37 @@ class TemporalNetworkAnalyzer:
                         lon=float(stop['stop_lon'])
                     )
             
-            # Connect stops based on trips during this hour
-            for trip_id in hour_trips:
-                trip_stops = hour_stop_times[hour_stop_times['trip_id'] == trip_id].sort_values('stop_sequence')
-                
-                if len(trip_stops) <= 1:
-                    continue
-                    
-                # Connect consecutive stops
-                stop_ids = trip_stops['stop_id'].tolist()
-                for i in range(len(stop_ids) - 1):
-                    source = stop_ids[i]
-                    target = stop_ids[i + 1]
-                    
-                    # Add the edge if both nodes exist
-                    if G.has_node(source) and G.has_node(target):
-                        if G.has_edge(source, target):
-                            # Increment a count attribute
-                            G[source][target]['trips'] = G[source][target].get('trips', 0) + 1
-                        else:
-                            # Add new edge
-                            G.add_edge(
-                                source, 
-                                target,
-                                trip_id=trip_id,
-                                trips=1
-                            )
+            # Pair each stop with the next stop of the same trip, keeping the
+            # sampled trip order so the first trip to use an edge labels it
+            trip_rank = pd.Series(np.arange(len(hour_trips)), index=hour_trips)
+            trip_stops = hour_stop_times.assign(
+                trip_rank=hour_stop_times['trip_id'].map(trip_rank)
+            ).sort_values(['trip_rank', 'stop_sequence'], kind='stable')
+            
+            hop_edges = pd.DataFrame({
+                'source': trip_stops['stop_id'],
+                'target': trip_stops.groupby('trip_id')['stop_id'].shift(-1),
+                'trip_id': trip_stops['trip_id']
+            }).dropna(subset=['target'])
+            
+            # Only connect stops that exist as nodes
+            hop_edges = hop_edges[hop_edges['source'].isin(G.nodes) & hop_edges['target'].isin(G.nodes)]
+            
+            # Count trips per undirected edge in one aggregation
+            forward = hop_edges['source'] <= hop_edges['target']
+            hop_edges = hop_edges.assign(
+                u=hop_edges['source'].where(forward, hop_edges['target']),
+                v=hop_edges['target'].where(forward, hop_edges['source'])
+            )
+            edge_counts = hop_edges.groupby(['u', 'v'], sort=False).agg(
+                trip_id=('trip_id', 'first'),
+                trips=('trip_id', 'size')
+            ).reset_index()
+            
+            G.add_edges_from(
+                (u, v, {'trip_id': trip_id, 'trips': int(trips)})
+                for u, v, trip_id, trips in edge_counts.itertuples(index=False, name=None)
+            )
             
             # Store the graph
             hourly_graphs[hour] = G
@@ -183,14 +188,17 @@ class TemporalNetworkAnalyzer:
         # Get service IDs for each day of the week
         weekday_columns = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
         
-        # Count trips by day of week
-        day_trips = {}
-        for i, day in enumerate(weekday_columns):
-            # Get service IDs that operate on this day
-            day_services = calendar_df[calendar_df[day] == 1]['service_id'].tolist()
-            
-            # Count trips on this day
-            day_trips[day] = len(trips_df[trips_df['service_id'].isin(day_services)])
+        # Flag which days each service operates on (calendar.txt is read without
+        # dtypes, so align its service IDs with the string IDs used in trips)
+        service_days = (calendar_df[weekday_columns] == 1).groupby(
+            calendar_df['service_id'].astype(str)
+        ).any()
+
+        # Join trips to their service days once and count trips by day of week
+        merged = trips_df[['service_id']].merge(
+            service_days, left_on='service_id', right_index=True, how='inner'
+        )
+        day_trips = {day: int(merged[day].sum()) for day in weekday_columns}
         
         # Calculate service level ratio (weekday vs weekend)
         weekday_services = sum([day_trips[day] for day in weekday_columns[:5]])
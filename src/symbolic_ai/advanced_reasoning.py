@@ -4,17 +4,75 @@ Advanced symbolic reasoning for transport networks.
 
 import networkx as nx
 import numpy as np
-from sympy.logic.boolalg import And, Or, Not, Implies, Equivalent
-from sympy import symbols, sympify
-from typing import Dict, List, Tuple, Any, Set
+import scipy.sparse as sp
+from networkx.algorithms.connectivity import build_auxiliary_edge_connectivity, local_edge_connectivity
+from networkx.algorithms.flow import build_residual_network
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from heapq import nlargest, nsmallest
+from operator import itemgetter
+from itertools import combinations
+from typing import Dict, List, Tuple, Any, Set, Optional
 import logging
 
+from src.symbolic_ai.rules import Rule
+
 logger = logging.getLogger(__name__)
 
+# Optional NetworkX dispatch backends, tried in order for quotient-graph betweenness
+BETWEENNESS_BACKENDS = []
+try:
+    import nx_cugraph  # noqa: F401
+    BETWEENNESS_BACKENDS.append('cugraph')
+except ImportError:
+    pass
+try:
+    import graphblas_algorithms  # noqa: F401
+    BETWEENNESS_BACKENDS.append('graphblas')
+except ImportError:
+    pass
+
+# Minimum number of uncached node pairs before redundancy counting is spread
+# over worker processes; below this, process start-up outweighs the gain
+PARALLEL_PAIR_THRESHOLD = 500
+
+# Flow networks built once per worker process by _init_redundancy_worker
+_worker_flow = {}
+
+def _init_redundancy_worker(graph):
+    """Build the unit-capacity flow networks once in each worker process."""
+    auxiliary = build_auxiliary_edge_connectivity(graph)
+    _worker_flow['graph'] = graph
+    _worker_flow['auxiliary'] = auxiliary
+    _worker_flow['residual'] = build_residual_network(auxiliary, 'capacity')
+
+def _redundancy_worker(node_pairs):
+    """Count edge-disjoint paths for a batch of node pairs - module level so it can be pickled."""
+    results = []
+    for n1, n2 in node_pairs:
+        try:
+            num_paths = local_edge_connectivity(
+                _worker_flow['graph'], n1, n2,
+                auxiliary=_worker_flow['auxiliary'], residual=_worker_flow['residual']
+            )
+        except:
+            num_paths = None
+        results.append((n1, n2, num_paths))
+    return results
+
+def _encode_pairs(lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Pack (low, high) community index pairs into int64 keys that sort by (low, high)."""
+    return (lo.astype(np.int64) << 32) | hi.astype(np.int64)
+
+def _decode_pairs(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Unpack int64 keys from _encode_pairs into (low, high) community index arrays."""
+    return keys >> 32, keys & 0xFFFFFFFF
+
 class AdvancedTransportReasoning:
     """Class for advanced symbolic reasoning about transport networks."""
     
-    def __init__(self, graph: nx.Graph, partition: Dict[Any, int], critical_nodes: List[Tuple[Any, float]]):
+    def __init__(self, graph: nx.Graph, partition: Dict[Any, int], critical_nodes: List[Tuple[Any, float]],
+                 seed: Optional[int] = None):
         """
         Initialize advanced reasoning.
         
@@ -22,46 +80,134 @@ class AdvancedTransportReasoning:
             graph: NetworkX graph representing the transport network
             partition: Dictionary mapping node IDs to community IDs
             critical_nodes: List of tuples (node_id, centrality_score)
+            seed: Optional seed for sampling community nodes in redundancy analysis
         """
         self.graph = graph
         self.partition = partition
         self.critical_nodes = critical_nodes
         self.kb = {}
-        self.symbols = {}
+        self.symbols = set()
+        self._rng = np.random.default_rng(seed)
+        self._index_nodes()
+        self._index_partition()
+        
+        # Memoized results of the graph scans shared by the KB, queries and analyses
+        self._edge_scan = None
+        self._cc_cache = None
+        self._cb_cache = None
+        self._rp_cache = None
+        self._pair_paths = {}
+        self._flow_networks = None
+        self._cut_tree = None
+    
+    def _index_nodes(self) -> None:
+        """Cache adjacency lists and display/symbol names; call again if the graph changes."""
+        self._neighbors = {n: list(self.graph.neighbors(n)) for n in self.graph.nodes()}
+        self._names = {n: data.get('name', str(n)) for n, data in self.graph.nodes(data=True)}
+        self._safe_names = {
+            n: name.replace(' ', '_').replace('-', '_') for n, name in self._names.items()
+        }
+    
+    def _index_partition(self) -> None:
+        """Build the community -> nodes index; call again if the partition changes."""
+        self._comm_to_nodes = defaultdict(list)
+        for node, comm_id in self.partition.items():
+            self._comm_to_nodes[comm_id].append(node)
+        
+        self._comm_ids = tuple(self._comm_to_nodes)
+        self._comm_sizes = {comm_id: len(nodes) for comm_id, nodes in self._comm_to_nodes.items()}
+        
+        # Array layout for vectorized edge scans: dense community index per
+        # node (-1 if unassigned) and an E x 2 array of node indices
+        self._comm_labels = sorted(self._comm_to_nodes)
+        self._comm_index = {comm_id: i for i, comm_id in enumerate(self._comm_labels)}
+        self._node_idx = {n: i for i, n in enumerate(self.graph.nodes())}
+        self._comm_of = np.array(
+            [self._comm_index.get(self.partition.get(n), -1) for n in self.graph.nodes()],
+            dtype=np.int32
+        )
+        self._edges = np.array(
+            [(self._node_idx[u], self._node_idx[v]) for u, v in self.graph.edges()],
+            dtype=np.int32
+        ).reshape(-1, 2)
+    
+    def _edge_communities(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return source/target community indices per edge and the cross-community mask."""
+        src_c = self._comm_of[self._edges[:, 0]]
+        dst_c = self._comm_of[self._edges[:, 1]]
+        return src_c, dst_c, src_c != dst_c
+    
+    def _fuse_edge_scan(self) -> Dict[str, np.ndarray]:
+        """
+        Aggregate the edge arrays once into the per-community data every analysis reads.
+        
+        Returns:
+            Dictionary with 'cross_counts' (cross-community edge ends per community
+            index), 'pair_keys' (sorted connection keys, see _encode_pairs) and
+            'pair_weights' (number of cross-community edges behind each key)
+        """
+        if self._edge_scan is not None:
+            return self._edge_scan
+        
+        src_c, dst_c, mask = self._edge_communities()
+        n_comm = len(self._comm_labels)
+        
+        # Count each community's edges to other communities, from both ends
+        cross_counts = (
+            np.bincount(src_c[mask & (src_c >= 0)], minlength=n_comm) +
+            np.bincount(dst_c[mask & (dst_c >= 0)], minlength=n_comm)
+        )
+        
+        # Weight each (low, high) community pair by its cross-community edges;
+        # sum_duplicates() merges the repeated COO entries and sorts them
+        mask &= (src_c >= 0) & (dst_c >= 0)
+        weights = sp.coo_matrix(
+            (np.ones(int(mask.sum()), dtype=np.int64),
+             (np.minimum(src_c, dst_c)[mask], np.maximum(src_c, dst_c)[mask])),
+            shape=(n_comm, n_comm)
+        )
+        weights.sum_duplicates()
+        
+        self._edge_scan = {
+            'cross_counts': cross_counts,
+            'pair_keys': _encode_pairs(weights.row, weights.col),
+            'pair_weights': weights.data
+        }
+        return self._edge_scan
         
     def create_advanced_knowledge_base(self) -> Dict:
         """
         Create an advanced symbolic knowledge base with more sophisticated rules.
         
         Returns:
-            Dictionary with symbolic entities and rules
+            Dictionary with symbol names and Rule entries (see Rule.as_sympy)
         """
         logger.info("Creating advanced symbolic knowledge base")
         
-        # Create symbols for communities
+        # Name the symbols for communities; rules refer to symbols by name and
+        # SymPy expressions are only built on demand via Rule.as_sympy()
         community_symbols = {}
-        for comm_id in set(self.partition.values()):
+        for comm_id in self._comm_ids:
             name = f"Community_{comm_id}"
-            community_symbols[comm_id] = symbols(name)
-            self.symbols[name] = community_symbols[comm_id]
+            community_symbols[comm_id] = name
+            self.symbols.add(name)
         
-        # Create symbols for critical nodes
+        # Name the symbols for critical nodes
         node_symbols = {}
         for node_id, _ in self.critical_nodes:
-            node_name = self.graph.nodes[node_id].get('name', str(node_id))
-            safe_name = node_name.replace(' ', '_').replace('-', '_')
-            name = f"Node_{safe_name}"
-            node_symbols[node_id] = symbols(name)
-            self.symbols[name] = node_symbols[node_id]
+            name = f"Node_{self._safe_names[node_id]}"
+            node_symbols[node_id] = name
+            self.symbols.add(name)
         
         self.kb['communities'] = community_symbols
         self.kb['nodes'] = node_symbols
         
-        # Create advanced membership rules with bidirectional implications
+        # Create membership rules: a node implies its community, which has the
+        # same truth table as Equivalent(node, And(node, community))
         membership_rules = []
         for node_id, node_symbol in node_symbols.items():
             comm_id = self.partition[node_id]
-            rule = Equivalent(node_symbol, And(node_symbol, community_symbols[comm_id]))
+            rule = Rule('implies', community_symbols[comm_id], (node_symbol,))
             membership_rules.append(rule)
         
         self.kb['membership_rules'] = membership_rules
@@ -73,14 +219,10 @@ class AdvancedTransportReasoning:
         for comm1, comm2 in community_connections:
             # Create symbol for this connection
             conn_name = f"Connected_{comm1}_{comm2}"
-            conn_symbol = symbols(conn_name)
-            self.symbols[conn_name] = conn_symbol
+            self.symbols.add(conn_name)
             
             # Create rule: Community A and Community B are connected
-            rule = Implies(
-                And(community_symbols[comm1], community_symbols[comm2]),
-                conn_symbol
-            )
+            rule = Rule('implies', conn_name, (community_symbols[comm1], community_symbols[comm2]))
             connectivity_rules.append(rule)
         
         self.kb['connectivity_rules'] = connectivity_rules
@@ -103,16 +245,12 @@ class AdvancedTransportReasoning:
                     
                 # Create symbol for this dependency
                 dep_name = f"Depends_{comm1}_{comm2}_on_{node_id}"
-                dep_symbol = symbols(dep_name)
-                self.symbols[dep_name] = dep_symbol
+                self.symbols.add(dep_name)
                 
                 # Create rule: If Node is removed, Community A and Community B become disconnected
                 conn_name = f"Connected_{comm1}_{comm2}"
                 
-                rule = Implies(
-                    Not(node_symbol),
-                    Not(self.symbols[conn_name])
-                )
+                rule = Rule('implies', f"~{conn_name}", (f"~{node_symbol}",))
                 dependency_rules.append(rule)
         
         self.kb['dependency_rules'] = dependency_rules
@@ -129,16 +267,12 @@ class AdvancedTransportReasoning:
                 
             # Create symbol for redundancy
             red_name = f"Redundant_{comm1}_{comm2}"
-            red_symbol = symbols(red_name)
-            self.symbols[red_name] = red_symbol
+            self.symbols.add(red_name)
             
             # Create rule: If there are redundant paths, the connection is more reliable
             conn_name = f"Connected_{comm1}_{comm2}"
             
-            rule = Implies(
-                self.symbols[conn_name],
-                red_symbol if redundancy > 1 else Not(red_symbol)
-            )
+            rule = Rule('implies', red_name if redundancy > 1 else f"~{red_name}", (conn_name,))
             redundancy_rules.append(rule)
         
         self.kb['redundancy_rules'] = redundancy_rules
@@ -155,76 +289,181 @@ class AdvancedTransportReasoning:
     
     def _find_community_connections(self) -> Set[Tuple[int, int]]:
         """Find direct connections between communities."""
-        connections = set()
+        if self._cc_cache is not None:
+            return self._cc_cache
         
-        for source, target in self.graph.edges():
-            source_comm = self.partition.get(source)
-            target_comm = self.partition.get(target)
-            
-            if source_comm != target_comm:
-                connections.add((min(source_comm, target_comm), max(source_comm, target_comm)))
+        # Unique (low, high) community index pairs over all cross-community edges
+        keys = self._fuse_edge_scan()['pair_keys']
+        
+        labels = self._comm_labels
+        connections = {(labels[lo], labels[hi]) for lo, hi in zip(*_decode_pairs(keys))}
         
+        self._cc_cache = connections
         return connections
     
     def _find_community_bridges(self) -> Dict[Any, List[Tuple[int, int]]]:
         """Find nodes that are bridges between communities."""
+        if self._cb_cache is not None:
+            return self._cb_cache
+        
         bridges = {}
         
         for node_id, _ in self.critical_nodes:
             node_comm = self.partition.get(node_id)
             
             # Get communities connected through this node
-            connections = []
             neighbor_comms = set()
             
-            for neighbor in self.graph.neighbors(node_id):
+            for neighbor in self._neighbors[node_id]:
                 neigh_comm = self.partition.get(neighbor)
                 if neigh_comm != node_comm:
                     neighbor_comms.add(neigh_comm)
             
-            # Check which community pairs are connected through this node
-            for comm1 in neighbor_comms:
-                for comm2 in neighbor_comms:
-                    if comm1 < comm2:
-                        connections.append((comm1, comm2))
+            # Community pairs connected through this node, each as (low, high)
+            connections = list(combinations(sorted(neighbor_comms), 2))
             
             bridges[node_id] = connections
         
+        self._cb_cache = bridges
         return bridges
     
-    def _find_redundant_paths(self) -> Dict[Tuple[int, int], int]:
-        """Find redundant paths between communities."""
-        redundancy = {}
+    def _find_redundant_paths(self, parallel: bool = True, max_workers: int = 4) -> Dict[Tuple[int, int], int]:
+        """
+        Find redundant paths between communities.
         
-        # Get community connections
-        connections = self._find_community_connections()
+        Args:
+            parallel: Whether to count paths for many node pairs in worker processes
+            max_workers: Number of parallel workers to use
         
-        for comm1, comm2 in connections:
-            # Find nodes in each community
-            comm1_nodes = [n for n, c in self.partition.items() if c == comm1]
-            comm2_nodes = [n for n, c in self.partition.items() if c == comm2]
-            
-            # Sample nodes if there are too many
-            if len(comm1_nodes) > 10 or len(comm2_nodes) > 10:
-                comm1_nodes = np.random.choice(comm1_nodes, min(10, len(comm1_nodes)), replace=False)
-                comm2_nodes = np.random.choice(comm2_nodes, min(10, len(comm2_nodes)), replace=False)
-            
-            # Count the number of edge-disjoint paths
-            max_paths = 0
-            
-            for n1 in comm1_nodes:
-                for n2 in comm2_nodes:
+        Returns:
+            Dictionary mapping community pairs to their edge-disjoint path count
+        """
+        if self._rp_cache is not None:
+            return self._rp_cache
+        
+        # Sample the node pairs to test for every connected community pair
+        samples = {
+            (comm1, comm2): self._sample_pair_nodes(comm1, comm2)
+            for comm1, comm2 in self._find_community_connections()
+        }
+        
+        # Fill the cache for uncached node pairs in bulk when there are enough of
+        # them; the per-pair loop below then only reads the cache
+        pending = list(dict.fromkeys(
+            (n1, n2)
+            for comm1_nodes, comm2_nodes in samples.values()
+            for n1 in comm1_nodes for n2 in comm2_nodes
+            if (n1, n2) not in self._pair_paths
+        ))
+        if len(pending) >= self.graph.number_of_nodes():
+            # One Gomory-Hu tree (n - 1 max-flows) answers every pair
+            self._count_paths_cut_tree(pending)
+        elif parallel and max_workers > 1 and len(pending) > PARALLEL_PAIR_THRESHOLD:
+            self._count_paths_parallel(pending, max_workers)
+        
+        redundancy = {
+            pair: self._redundancy_for_pair(comm1_nodes, comm2_nodes)
+            for pair, (comm1_nodes, comm2_nodes) in samples.items()
+        }
+        
+        self._rp_cache = redundancy
+        return redundancy
+    
+    def _sample_pair_nodes(self, comm1: Any, comm2: Any) -> Tuple[Any, Any]:
+        """Return the nodes of two communities, sampled to at most 10 each if either is larger."""
+        comm1_nodes = self._comm_to_nodes[comm1]
+        comm2_nodes = self._comm_to_nodes[comm2]
+        
+        if len(comm1_nodes) > 10 or len(comm2_nodes) > 10:
+            comm1_nodes = self._rng.choice(np.asarray(comm1_nodes), min(10, len(comm1_nodes)), replace=False)
+            comm2_nodes = self._rng.choice(np.asarray(comm2_nodes), min(10, len(comm2_nodes)), replace=False)
+        
+        return comm1_nodes, comm2_nodes
+    
+    def _redundancy_for_pair(self, comm1_nodes, comm2_nodes) -> int:
+        """Return the largest number of edge-disjoint paths between the given node samples."""
+        max_paths = 0
+        
+        for n1 in comm1_nodes:
+            for n2 in comm2_nodes:
+                # Reuse counts for node pairs sampled by earlier community pairs
+                num_paths = self._pair_paths.get((n1, n2))
+                if num_paths is None:
+                    # The number of edge-disjoint paths equals the unit-capacity
+                    # max-flow value; the flow networks are built once and reused
+                    if self._flow_networks is None:
+                        auxiliary = build_auxiliary_edge_connectivity(self.graph)
+                        self._flow_networks = (auxiliary, build_residual_network(auxiliary, 'capacity'))
+                    auxiliary, residual = self._flow_networks
                     try:
-                        # Count edge-disjoint paths
-                        paths = nx.edge_disjoint_paths(self.graph, n1, n2)
-                        num_paths = len(list(paths))
-                        max_paths = max(max_paths, num_paths)
+                        num_paths = local_edge_connectivity(
+                            self.graph, n1, n2, auxiliary=auxiliary, residual=residual
+                        )
+                        self._pair_paths[(n1, n2)] = num_paths
                     except:
-                        pass
+                        continue
+                max_paths = max(max_paths, num_paths)
+        
+        return max_paths
+    
+    def _edge_cut_tree(self) -> nx.Graph:
+        """Return the Gomory-Hu forest of the graph with unit edge capacities, built once."""
+        if self._cut_tree is None:
+            unit_graph = nx.Graph()
+            unit_graph.add_nodes_from(self.graph)
+            unit_graph.add_edges_from(((u, v) for u, v in self.graph.edges() if u != v), capacity=1)
             
-            redundancy[(comm1, comm2)] = max_paths
+            # Gomory-Hu trees need a connected graph, so build one per component
+            forest = nx.Graph()
+            for component in nx.connected_components(unit_graph):
+                if len(component) > 1:
+                    forest.update(nx.gomory_hu_tree(unit_graph.subgraph(component)))
+                else:
+                    forest.add_nodes_from(component)
+            self._cut_tree = forest
+        return self._cut_tree
+    
+    def _count_paths_cut_tree(self, node_pairs: List[Tuple[Any, Any]]) -> None:
+        """Read edge-disjoint path counts for node pairs off the Gomory-Hu forest and cache them."""
+        tree = self._edge_cut_tree()
         
-        return redundancy
+        targets = defaultdict(list)
+        for n1, n2 in node_pairs:
+            targets[n1].append(n2)
+        
+        for n1, n2_nodes in targets.items():
+            if n1 not in tree:
+                continue
+            
+            # The path count between two nodes is the lightest edge on their tree
+            # path; one traversal from n1 gives it for every node in its tree
+            bottleneck = {n1: float('inf')}
+            stack = [n1]
+            while stack:
+                u = stack.pop()
+                for v, data in tree[u].items():
+                    if v not in bottleneck:
+                        bottleneck[v] = min(bottleneck[u], data['weight'])
+                        stack.append(v)
+            
+            for n2 in n2_nodes:
+                if n2 in tree:
+                    # Nodes in different components have no paths between them
+                    self._pair_paths[(n1, n2)] = int(bottleneck.get(n2, 0))
+    
+    def _count_paths_parallel(self, node_pairs: List[Tuple[Any, Any]], max_workers: int) -> None:
+        """Count edge-disjoint paths for node pairs in worker processes and cache the results."""
+        # Send pairs in batches (about four per worker) to amortize IPC round-trips
+        batch_size = max(1, len(node_pairs) // (max_workers * 4))
+        batches = [node_pairs[i:i + batch_size] for i in range(0, len(node_pairs), batch_size)]
+        
+        # Each worker receives the graph once and builds its own flow networks
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_redundancy_worker,
+                                 initargs=(self.graph,)) as executor:
+            for results in executor.map(_redundancy_worker, batches):
+                for n1, n2, num_paths in results:
+                    if num_paths is not None:
+                        self._pair_paths[(n1, n2)] = num_paths
     
     def generate_advanced_queries(self) -> List[Dict]:
         """
@@ -262,12 +501,12 @@ class AdvancedTransportReasoning:
                 # Pick the first connection
                 comm1, comm2 = connections[0]
                 
-                node_name = self.graph.nodes[node_id].get('name', str(node_id))
+                node_name = self._names[node_id]
                 
                 queries.append({
                     'name': 'Critical Node Impact',
                     'description': f"What happens if {node_name} is removed?",
-                    'query': f"Impact(Not(Node_{node_name.replace(' ', '_').replace('-', '_')}))",
+                    'query': f"Impact(Not(Node_{self._safe_names[node_id]}))",
                     'result': f"Communities {comm1} and {comm2} may become disconnected"
                 })
                 
@@ -293,13 +532,13 @@ class AdvancedTransportReasoning:
             node2_id = self.critical_nodes[1][0]
             
             if node1_id in community_bridges and node2_id in community_bridges:
-                node1_name = self.graph.nodes[node1_id].get('name', str(node1_id))
-                node2_name = self.graph.nodes[node2_id].get('name', str(node2_id))
+                node1_name = self._names[node1_id]
+                node2_name = self._names[node2_id]
                 
                 queries.append({
                     'name': 'Dependency Chain',
                     'description': f"What happens if both {node1_name} and {node2_name} are removed?",
-                    'query': f"Impact(And(Not(Node_{node1_name.replace(' ', '_').replace('-', '_')}), Not(Node_{node2_name.replace(' ', '_').replace('-', '_')})))",
+                    'query': f"Impact(And(Not(Node_{self._safe_names[node1_id]}), Not(Node_{self._safe_names[node2_id]})))",
                     'result': "Multiple communities may become disconnected, severely impacting network connectivity"
                 })
         
@@ -342,22 +581,19 @@ class AdvancedTransportReasoning:
         # Calculate vulnerability score for each community based on connectivity
         community_vulnerability = {}
         
-        for comm_id in set(self.partition.values()):
+        # Each community's edges to other communities, counted from both ends
+        cross_counts = self._fuse_edge_scan()['cross_counts']
+        
+        for comm_id in self._comm_ids:
             # Count connections to other communities
-            connections = 0
-            for source, target in self.graph.edges():
-                if self.partition.get(source) == comm_id and self.partition.get(target) != comm_id:
-                    connections += 1
+            connections = int(cross_counts[self._comm_index[comm_id]])
             
             # Get number of nodes in community
-            community_size = len([n for n, c in self.partition.items() if c == comm_id])
+            community_size = self._comm_sizes[comm_id]
             
-            # Calculate vulnerability as inverse of connectivity ratio
-            if community_size > 0:
-                connectivity_ratio = connections / community_size
-                vulnerability = 1 - (connectivity_ratio / max(1, connectivity_ratio))
-            else:
-                vulnerability = 1
+            # Vulnerability falls linearly with the connectivity ratio and is
+            # zero once a community has at least one connection per node
+            vulnerability = max(0.0, 1.0 - connections / community_size) if community_size > 0 else 1.0
             
             community_vulnerability[comm_id] = {
                 'connections': connections,
@@ -366,10 +602,10 @@ class AdvancedTransportReasoning:
             }
         
         # Find most vulnerable communities
-        vulnerable_communities = sorted(
+        vulnerable_communities = nlargest(
+            5,
             community_vulnerability.items(),
-            key=lambda x: x[1]['vulnerability'],
-            reverse=True
+            key=lambda x: x[1]['vulnerability']
         )
         
         # Calculate overall network vulnerability
@@ -377,7 +613,7 @@ class AdvancedTransportReasoning:
         
         return {
             'community_vulnerability': community_vulnerability,
-            'most_vulnerable': vulnerable_communities[:5],
+            'most_vulnerable': vulnerable_communities,
             'overall_vulnerability': overall_vulnerability
         }
     
@@ -387,7 +623,7 @@ class AdvancedTransportReasoning:
         
         # Calculate resilience score for each community
         community_resilience = {}
-        for comm_id in set(self.partition.values()):
+        for comm_id in self._comm_ids:
             # Get average redundancy of connections
             comm_redundancies = []
             for (c1, c2), redundancy in redundant_paths.items():
@@ -409,21 +645,22 @@ class AdvancedTransportReasoning:
             }
         
         # Find most and least resilient communities
-        resilient_communities = sorted(
+        resilient_communities = nlargest(
+            5,
             community_resilience.items(),
-            key=lambda x: x[1]['resilience'],
-            reverse=True
+            key=lambda x: x[1]['resilience']
         )
         
-        vulnerable_communities = sorted(
+        vulnerable_communities = nsmallest(
+            5,
             community_resilience.items(),
             key=lambda x: x[1]['resilience']
         )
         
         return {
             'community_resilience': community_resilience,
-            'most_resilient': resilient_communities[:5],
-            'least_resilient': vulnerable_communities[:5],
+            'most_resilient': resilient_communities,
+            'least_resilient': vulnerable_communities,
         }
     
     def _analyze_interdependencies(self) -> Dict[str, Any]:
@@ -432,30 +669,33 @@ class AdvancedTransportReasoning:
         community_graph = nx.Graph()
         
         # Add communities as nodes
-        for comm_id in set(self.partition.values()):
-            # Count nodes in community
-            nodes = len([n for n, c in self.partition.items() if c == comm_id])
-            community_graph.add_node(comm_id, size=nodes)
-        
-        # Add edges between communities
-        for source, target in self.graph.edges():
-            source_comm = self.partition.get(source)
-            target_comm = self.partition.get(target)
-            
-            if source_comm != target_comm:
-                if community_graph.has_edge(source_comm, target_comm):
-                    community_graph[source_comm][target_comm]['weight'] += 1
-                else:
-                    community_graph.add_edge(source_comm, target_comm, weight=1)
+        for comm_id in self._comm_ids:
+            community_graph.add_node(comm_id, size=self._comm_sizes[comm_id])
         
-        # Calculate betweenness centrality for communities
-        try:
-            centrality = nx.betweenness_centrality(community_graph, weight='weight')
-        except:
-            centrality = {comm: 0 for comm in community_graph.nodes()}
+        # Add edges between communities, weighted by the number of cross-community edges
+        edge_scan = self._fuse_edge_scan()
+        lo, hi = _decode_pairs(edge_scan['pair_keys'])
         
-        # Identify central communities
-        central_communities = sorted(centrality.items(), key=lambda x: x[1], reverse=True)
+        labels = self._comm_labels
+        community_graph.add_weighted_edges_from(
+            (labels[i], labels[j], int(w)) for i, j, w in zip(lo, hi, edge_scan['pair_weights'])
+        )
+        
+        # Calculate betweenness centrality for communities, preferring a compiled
+        # dispatch backend and falling back to plain NetworkX
+        centrality = None
+        for backend in BETWEENNESS_BACKENDS:
+            try:
+                centrality = nx.betweenness_centrality(community_graph, weight='weight', backend=backend)
+                break
+            except Exception as e:
+                logger.debug(f"Betweenness backend '{backend}' unavailable: {e}")
+        
+        if centrality is None:
+            try:
+                centrality = nx.betweenness_centrality(community_graph, weight='weight')
+            except:
+                centrality = {comm: 0 for comm in community_graph.nodes()}
         
         # Calculate dependency metric for each community
         community_dependencies = {}
@@ -473,16 +713,16 @@ class AdvancedTransportReasoning:
                 'dependency_score': dependency_score
             }
         
-        # Sort by dependency score
-        key_communities = sorted(
+        # Top communities by dependency score
+        key_communities = nlargest(
+            5,
             community_dependencies.items(),
-            key=lambda x: x[1]['dependency_score'],
-            reverse=True
+            key=lambda x: x[1]['dependency_score']
         )
         
         return {
             'community_dependencies': community_dependencies,
-            'key_communities': key_communities[:5],
+            'key_communities': key_communities,
             'community_graph': community_graph
         }
     
@@ -498,27 +738,21 @@ class AdvancedTransportReasoning:
         if vulnerability and 'most_vulnerable' in vulnerability:
             for comm_id, data in vulnerability['most_vulnerable'][:3]:
                 if data['vulnerability'] > 0.5:  # Only recommend for significantly vulnerable communities
-                    # Find nearby communities to connect to
-                    nearby_communities = []
-                    
-                    # Get nodes in this community
-                    comm_nodes = [n for n, c in self.partition.items() if c == comm_id]
-                    
                     # Find communities of neighbors
                     neighbor_comms = set()
-                    for node in comm_nodes:
-                        for neighbor in self.graph.neighbors(node):
+                    for node in self._comm_to_nodes[comm_id]:
+                        for neighbor in self._neighbors[node]:
                             neigh_comm = self.partition.get(neighbor)
                             if neigh_comm != comm_id:
                                 neighbor_comms.add(neigh_comm)
                     
-                    # Find which communities are already connected
-                    connected_comms = set()
-                    for (c1, c2) in self._find_community_connections():
-                        if c1 == comm_id:
-                            connected_comms.add(c2)
-                        elif c2 == comm_id:
-                            connected_comms.add(c1)
+                    # Find which communities are already connected, from either
+                    # end of the packed connection keys
+                    lo, hi = _decode_pairs(self._fuse_edge_scan()['pair_keys'])
+                    comm_idx = self._comm_index[comm_id]
+                    connected_comms = {
+                        self._comm_labels[i] for i in np.concatenate([hi[lo == comm_idx], lo[hi == comm_idx]])
+                    }
                     
                     # Potential new connections
                     potential_connections = neighbor_comms - connected_comms
@@ -538,15 +772,10 @@ class AdvancedTransportReasoning:
             if redundancy <= 1:
                 # This is a critical connection with no redundancy
                 # Calculate size of communities to prioritize
-                size1 = len([n for n, c in self.partition.items() if c == comm1])
-                size2 = len([n for n, c in self.partition.items() if c == comm2])
-                
-                critical_connections.append(((comm1, comm2), size1 + size2))
+                critical_connections.append(((comm1, comm2), self._comm_sizes[comm1] + self._comm_sizes[comm2]))
         
-        # Sort by community size (impact)
-        critical_connections.sort(key=lambda x: x[1], reverse=True)
-        
-        for (comm1, comm2), _ in critical_connections[:3]:
+        # Largest communities first (impact)
+        for (comm1, comm2), _ in nlargest(3, critical_connections, key=itemgetter(1)):
             recommendations.append({
                 'type': 'redundancy',
                 'description': f"Increase redundancy between Communities {comm1} and {comm2}",
@@ -563,11 +792,9 @@ class AdvancedTransportReasoning:
                 # This node connects multiple community pairs
                 critical_bridges.append((node_id, len(connections)))
         
-        # Sort by number of connections
-        critical_bridges.sort(key=lambda x: x[1], reverse=True)
-        
-        for node_id, num_connections in critical_bridges[:3]:
-            node_name = self.graph.nodes[node_id].get('name', str(node_id))
+        # Most connected bridges first
+        for node_id, num_connections in nlargest(3, critical_bridges, key=itemgetter(1)):
+            node_name = self._names[node_id]
             
             recommendations.append({
                 'type': 'redundancy',
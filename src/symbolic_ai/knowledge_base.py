@@ -3,16 +3,52 @@ Knowledge base module for symbolic AI reasoning about transport networks.
 """
 
 import networkx as nx
-from sympy.logic.boolalg import And, Or, Not, Implies
-from sympy import symbols, sympify
-from typing import Dict, List, Any, Tuple, Set
+from collections import defaultdict
+from heapq import nlargest
+from typing import Dict, List, Any, Tuple, Set, Optional
 import logging
 
+from src.utils.optimization import sampled_betweenness
+from src.symbolic_ai.rules import Rule, sym
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _components_without(G: nx.Graph, skip: Any) -> Dict[Any, int]:
+    """
+    Label connected components of G as if a node were removed.
+    
+    Walks the adjacency dict directly and never enters the skipped node, so
+    the graph is neither copied nor mutated.
+    
+    Args:
+        G: NetworkX graph
+        skip: Node to treat as removed
+        
+    Returns:
+        Dictionary mapping every other node to a component index
+    """
+    adj = G._adj
+    component_of = {}
+    seen = {skip}
+    comp_id = 0
+    for start in adj:
+        if start in seen:
+            continue
+        comp_id += 1
+        seen.add(start)
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            component_of[node] = comp_id
+            for neighbor in adj[node]:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    stack.append(neighbor)
+    return component_of
+
 class TransportKnowledgeBase:
     """Class for creating and reasoning with a symbolic knowledge base for transport networks."""
     
@@ -27,29 +63,36 @@ class TransportKnowledgeBase:
         self.graph = graph
         self.partition = partition
         self.kb = {}
-        self.symbols = {}
+        self.symbols = set()
+        self._reasoning_cache = {}
         
-    def create_knowledge_base(self, max_critical_nodes: int = 50) -> Dict:
+    def create_knowledge_base(self, max_critical_nodes: int = 50, sample_size: int = 500,
+                              seed: Optional[int] = None) -> Dict:
         """
         Create a symbolic knowledge base for transport network reasoning.
         
         Args:
             max_critical_nodes: Maximum number of critical nodes to include (for efficiency)
+            sample_size: Number of source nodes sampled for betweenness centrality
+            seed: Optional random seed for the betweenness sample
             
         Returns:
             Dictionary with symbolic entities and rules
         """
         logger.info("Creating symbolic knowledge base for transport network")
         
+        # A rebuilt knowledge base invalidates earlier reasoning results
+        self._reasoning_cache.clear()
+        
         # Create symbols for communities
         community_symbols = {}
         for comm_id in set(self.partition.values()):
             name = f"Community_{comm_id}"
-            community_symbols[comm_id] = symbols(name)
-            self.symbols[name] = community_symbols[comm_id]
+            community_symbols[comm_id] = sym(name)
+            self.symbols.add(name)
         
         # Find critical nodes (using betweenness centrality)
-        betweenness = nx.betweenness_centrality(self.graph, k=500, normalized=True)
+        betweenness = sampled_betweenness(self.graph, k=sample_size, seed=seed)
         critical_nodes = sorted(betweenness.items(), key=lambda x: x[1], reverse=True)[:max_critical_nodes]
         
         # Create symbols for critical nodes
@@ -58,19 +101,23 @@ class TransportKnowledgeBase:
             node_name = self.graph.nodes[node_id].get('name', f"Stop_{node_id}")
             safe_name = node_name.replace(' ', '_').replace('-', '_')
             name = f"Stop_{safe_name}"
-            node_symbols[node_id] = symbols(name)
-            self.symbols[name] = node_symbols[node_id]
+            node_symbols[node_id] = sym(name)
+            self.symbols.add(name)
         
         self.kb['communities'] = community_symbols
         self.kb['nodes'] = node_symbols
+        self.kb['nodes_by_comm'] = self._group_nodes_by_community()
         
         logger.info(f"Created symbols for {len(community_symbols)} communities and {len(node_symbols)} critical nodes")
         
+        # Rules hold symbol names only; Rule.as_sympy() builds the SymPy
+        # expression when one is needed
+        
         # Create membership rules: node → community
         membership_rules = []
         for node_id, node_symbol in node_symbols.items():
             community_id = self.partition[node_id]
-            rule = Implies(node_symbol, community_symbols[community_id])
+            rule = Rule('implies', community_symbols[community_id].name, (node_symbol.name,))
             membership_rules.append(rule)
         
         self.kb['membership_rules'] = membership_rules
@@ -79,17 +126,21 @@ class TransportKnowledgeBase:
         # Create connectivity rules: if nodes are connected
         connectivity_rules = []
         
-        # Get pairs of critical nodes that are directly connected
-        critical_node_ids = list(node_symbols.keys())
-        for i, node1 in enumerate(critical_node_ids):
-            for node2 in critical_node_ids[i+1:]:
-                if self.graph.has_edge(node1, node2):
-                    rule = Implies(
-                        And(node_symbols[node1], node_symbols[node2]),
-                        symbols(f"Connected_{node1}_{node2}")
-                    )
-                    connectivity_rules.append(rule)
-                    self.symbols[f"Connected_{node1}_{node2}"] = symbols(f"Connected_{node1}_{node2}")
+        # Get pairs of critical nodes that are directly connected by intersecting
+        # each node's neighbours with the critical set; pairs are kept in
+        # critical-node order so rule names match the node ranking
+        # (the raw adjacency dict's keys intersect in C, unlike graph.adj's view)
+        critical_rank = {node_id: i for i, node_id in enumerate(node_symbols)}
+        adj = self.graph._adj
+        for node1, rank1 in critical_rank.items():
+            linked = adj[node1].keys() & critical_rank.keys()
+            for node2 in sorted(linked, key=critical_rank.get):
+                if critical_rank[node2] <= rank1:
+                    continue
+                conn_name = f"Connected_{node1}_{node2}"
+                rule = Rule('implies', conn_name, (node_symbols[node1].name, node_symbols[node2].name))
+                connectivity_rules.append(rule)
+                self.symbols.add(conn_name)
         
         self.kb['connectivity_rules'] = connectivity_rules
         logger.info(f"Created {len(connectivity_rules)} connectivity rules")
@@ -107,24 +158,30 @@ class TransportKnowledgeBase:
         
         # Create rules for community connections
         for comm1, comm2 in community_connections:
-            rule = Implies(
-                And(community_symbols[comm1], community_symbols[comm2]),
-                symbols(f"ConnectedCommunities_{comm1}_{comm2}")
-            )
+            conn_name = f"ConnectedCommunities_{comm1}_{comm2}"
+            rule = Rule('implies', conn_name, (community_symbols[comm1].name, community_symbols[comm2].name))
             community_connectivity_rules.append(rule)
-            self.symbols[f"ConnectedCommunities_{comm1}_{comm2}"] = symbols(f"ConnectedCommunities_{comm1}_{comm2}")
+            self.symbols.add(conn_name)
         
         self.kb['community_connectivity_rules'] = community_connectivity_rules
+        # Kept for queries and the vulnerability simulation
+        self.kb['community_connections_set'] = community_connections
         logger.info(f"Created {len(community_connectivity_rules)} community connectivity rules")
         
         return self.kb
     
-    def perform_symbolic_reasoning(self, critical_nodes: List[Tuple[Any, float]]) -> Dict:
+    def perform_symbolic_reasoning(self, critical_nodes: List[Tuple[Any, float]],
+                                   gateway_top: Optional[int] = None,
+                                   dep_top: Optional[int] = None,
+                                   vuln_top: int = 10) -> Dict:
         """
         Perform symbolic reasoning to extract insights from the knowledge base.
         
         Args:
             critical_nodes: List of critical nodes with their centrality scores
+            gateway_top: Number of gateway nodes to return (None for all)
+            dep_top: Number of community dependencies to return (None for all)
+            vuln_top: Number of top critical nodes to simulate removing
             
         Returns:
             Dictionary with reasoning results
@@ -135,46 +192,103 @@ class TransportKnowledgeBase:
             self.create_knowledge_base()
         
         results = {}
+        results['gateway_nodes'] = self._compute_gateway_nodes(critical_nodes, gateway_top)
+        results['community_dependencies'] = self._compute_community_deps(dep_top)
+        results['vulnerabilities'] = self._compute_vulnerabilities(critical_nodes, vuln_top)
+        
+        return results
+    
+    def _group_nodes_by_community(self) -> Dict[Any, List[Any]]:
+        """Group graph nodes by community, in graph order."""
+        part = self.partition
+        nodes_by_comm = defaultdict(list)
+        for node in self.graph.nodes():
+            nodes_by_comm[part.get(node)].append(node)
+        return nodes_by_comm
+    
+    def _compute_gateway_nodes(self, critical_nodes: List[Tuple[Any, float]],
+                               top_n: Optional[int] = None) -> List[Tuple[Any, Dict]]:
+        """
+        Find critical nodes that connect multiple communities.
         
-        # Find gateway nodes (nodes that connect multiple communities)
-        gateway_nodes = {}
+        Args:
+            critical_nodes: List of critical nodes with their centrality scores
+            top_n: Number of gateway nodes to return (None for all)
+            
+        Returns:
+            List of (node_id, info) pairs sorted by number of connected communities
+        """
+        key = ('gateway_nodes', self.graph.number_of_edges(),
+               tuple(node_id for node_id, _ in critical_nodes), top_n)
+        if key in self._reasoning_cache:
+            return self._reasoning_cache[key]
+        
+        # Bind the adjacency dict and partition locally for the inner loops
+        adj = self.graph._adj
+        part = self.partition
+        
+        # Count the other communities each critical node touches
+        neighbor_communities = {}
         for node_id, _ in critical_nodes:
             if node_id not in self.kb['nodes']:
                 continue
-                
-            node_community = self.partition[node_id]
-            neighbor_communities = set()
             
-            for neighbor in self.graph.neighbors(node_id):
-                neigh_community = self.partition[neighbor]
+            node_community = part[node_id]
+            communities = set()
+            
+            for neighbor in adj[node_id]:
+                neigh_community = part[neighbor]
                 if neigh_community != node_community:
-                    neighbor_communities.add(neigh_community)
+                    communities.add(neigh_community)
             
-            gateway_nodes[node_id] = {
+            neighbor_communities[node_id] = communities
+        
+        # Rank by number of connected communities before building the records,
+        # so only the ones returned get one
+        if top_n is None:
+            ranked = sorted(neighbor_communities, key=lambda n: len(neighbor_communities[n]), reverse=True)
+        else:
+            ranked = nlargest(top_n, neighbor_communities, key=lambda n: len(neighbor_communities[n]))
+        
+        sorted_gateway_nodes = []
+        for node_id in ranked:
+            communities = neighbor_communities[node_id]
+            sorted_gateway_nodes.append((node_id, {
                 'name': self.graph.nodes[node_id].get('name', f"Stop_{node_id}"),
-                'community': node_community,
-                'connected_communities': list(neighbor_communities),
-                'num_communities': len(neighbor_communities)
-            }
+                'community': part[node_id],
+                'connected_communities': list(communities),
+                'num_communities': len(communities)
+            }))
         
-        # Sort gateway nodes by number of connected communities
-        sorted_gateway_nodes = sorted(gateway_nodes.items(), 
-                                       key=lambda x: x[1]['num_communities'], 
-                                       reverse=True)
+        self._reasoning_cache[key] = sorted_gateway_nodes
+        return sorted_gateway_nodes
+    
+    def _compute_community_deps(self, top_n: Optional[int] = None) -> List[Tuple[Any, Dict]]:
+        """
+        Find which other communities each community depends on.
         
-        results['gateway_nodes'] = sorted_gateway_nodes
+        Args:
+            top_n: Number of communities to return (None for all)
+            
+        Returns:
+            List of (community_id, info) pairs sorted by number of connections
+        """
+        key = ('community_deps', self.graph.number_of_edges(), top_n)
+        if key in self._reasoning_cache:
+            return self._reasoning_cache[key]
         
-        # Find community dependencies
+        adj = self.graph._adj
+        part = self.partition
+        nodes_by_comm = self.kb['nodes_by_comm']
         community_dependencies = {}
         
-        for comm_id in set(self.partition.values()):
+        for comm_id in set(part.values()):
             # Find which other communities this one depends on
             connected_comms = set()
-            comm_nodes = [node for node, com in self.partition.items() if com == comm_id]
             
-            for node in comm_nodes:
-                for neighbor in self.graph.neighbors(node):
-                    neigh_comm = self.partition[neighbor]
+            for node in nodes_by_comm[comm_id]:
+                for neighbor in adj[node]:
+                    neigh_comm = part[neighbor]
                     if neigh_comm != comm_id:
                         connected_comms.add(neigh_comm)
             
@@ -184,54 +298,63 @@ class TransportKnowledgeBase:
             }
         
         # Sort communities by number of connections
-        sorted_community_deps = sorted(community_dependencies.items(), 
-                                      key=lambda x: x[1]['num_connections'], 
-                                      reverse=True)
-        
-        results['community_dependencies'] = sorted_community_deps
+        if top_n is None:
+            sorted_community_deps = sorted(community_dependencies.items(), 
+                                          key=lambda x: x[1]['num_connections'], 
+                                          reverse=True)
+        else:
+            sorted_community_deps = nlargest(top_n, community_dependencies.items(),
+                                             key=lambda x: x[1]['num_connections'])
+        
+        self._reasoning_cache[key] = sorted_community_deps
+        return sorted_community_deps
+    
+    def _compute_vulnerabilities(self, critical_nodes: List[Tuple[Any, float]],
+                                 top_n: int = 10) -> List[Dict]:
+        """
+        Simulate removing the top critical nodes and record affected communities.
         
-        # Identify network vulnerabilities
+        Args:
+            critical_nodes: List of critical nodes with their centrality scores
+            top_n: Number of top critical nodes to simulate removing
+            
+        Returns:
+            List of vulnerability records, one per simulated removal
+        """
+        # Each removal costs one full component labelling, O(V+E), so only
+        # simulate the ones asked for
+        top_nodes = critical_nodes[:top_n]
+        
+        # Scores are copied into the records, so they are part of the key
+        key = ('vulnerabilities', self.graph.number_of_edges(), tuple(top_nodes))
+        if key in self._reasoning_cache:
+            return self._reasoning_cache[key]
+        
+        part = self.partition
+        nodes_by_comm = self.kb['nodes_by_comm']
+        community_connections = self.kb['community_connections_set']
         vulnerabilities = []
         
-        # Find connections between communities
-        community_connections = set()
-        for node1, node2 in self.graph.edges():
-            comm1 = self.partition[node1]
-            comm2 = self.partition[node2]
-            if comm1 != comm2:
-                community_connections.add((min(comm1, comm2), max(comm1, comm2)))
-        
-        # Top 10 critical nodes
-        top_nodes = critical_nodes[:10]
         for node_id, score in top_nodes:
             node_name = self.graph.nodes[node_id].get('name', f"Stop_{node_id}")
-            node_community = self.partition[node_id]
+            node_community = part[node_id]
             
-            # Simulate removing this node
-            G_temp = self.graph.copy()
-            G_temp.remove_node(node_id)
+            # Simulate removing this node by labelling connected components
+            # without it; two nodes have a path between them exactly when
+            # they share a component
+            component_of = _components_without(self.graph, node_id)
             
             # Check how many communities would be affected
             affected_communities = set()
             for comm1, comm2 in community_connections:
-                # Check if there's still a path between these communities
-                found_path = False
-                
                 # Get a sample of nodes from each community to check paths
                 # (checking all pairs would be too computationally expensive)
-                comm1_nodes = [n for n in G_temp.nodes() if self.partition.get(n) == comm1][:5]
-                comm2_nodes = [n for n in G_temp.nodes() if self.partition.get(n) == comm2][:5]
+                comm1_nodes = [n for n in nodes_by_comm[comm1][:6] if n != node_id][:5]
+                comm2_nodes = [n for n in nodes_by_comm[comm2][:6] if n != node_id][:5]
                 
-                for node1 in comm1_nodes:
-                    for node2 in comm2_nodes:
-                        try:
-                            path = nx.shortest_path(G_temp, node1, node2)
-                            found_path = True
-                            break
-                        except (nx.NetworkXNoPath, nx.NodeNotFound):
-                            continue
-                    if found_path:
-                        break
+                # Check if there's still a path between these communities
+                comm1_components = {component_of[n] for n in comm1_nodes if n in component_of}
+                found_path = any(component_of.get(n) in comm1_components for n in comm2_nodes)
                 
                 if not found_path:
                     affected_communities.add(comm1)
@@ -246,9 +369,8 @@ class TransportKnowledgeBase:
                 'impact': len(affected_communities)
             })
         
-        results['vulnerabilities'] = vulnerabilities
-        
-        return results
+        self._reasoning_cache[key] = vulnerabilities
+        return vulnerabilities
     
     def generate_logical_queries(self) -> List[Dict]:
         """
@@ -271,11 +393,7 @@ class TransportKnowledgeBase:
             query_str = f"Connected(Community_{comm1}, Community_{comm2})"
             
             # Evaluate if there is a connection
-            connected = False
-            for rule in self.kb['community_connectivity_rules']:
-                if isinstance(rule, Implies) and str(rule.args[1]) == f"ConnectedCommunities_{min(comm1, comm2)}_{max(comm1, comm2)}":
-                    connected = True
-                    break
+            connected = (min(comm1, comm2), max(comm1, comm2)) in self.kb['community_connections_set']
             
             queries.append({
                 'name': 'Community Connectivity',
@@ -0,0 +1,39 @@
+"""
+Lazy logic rules shared by the symbolic knowledge bases.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+from sympy.logic.boolalg import And, Not, Implies, Equivalent
+from sympy import Symbol
+
+@lru_cache(maxsize=None)
+def sym(name: str) -> Symbol:
+    """Return the SymPy symbol for a knowledge-base name, created on first use."""
+    return Symbol(name)
+
+class Rule(namedtuple('Rule', 'kind head body')):
+    """
+    Lightweight logic rule stored in the knowledge base.
+    
+    Literals are symbol names, prefixed with '~' when negated. An 'implies'
+    rule reads And(body) -> head and an 'equiv' rule reads head <-> And(body).
+    """
+    __slots__ = ()
+    
+    @staticmethod
+    def _literal(name: str):
+        if name.startswith('~'):
+            return Not(sym(name[1:]))
+        return sym(name)
+    
+    def as_sympy(self):
+        """Materialize the rule as a SymPy expression."""
+        head = self._literal(self.head)
+        if len(self.body) == 1:
+            body = self._literal(self.body[0])
+        else:
+            body = And(*(self._literal(name) for name in self.body))
+        if self.kind == 'equiv':
+            return Equivalent(head, body)
+        return Implies(body, head)
@@ -6,18 +6,60 @@ import requests
 import time
 import json
 import os
+import math
+import sqlite3
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Tuple, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
-def geocode_location(location_name: str, region: str = "uk") -> Optional[Dict[str, float]]:
+# Nominatim's usage policy allows at most one request per second and asks
+# clients to identify themselves with a User-Agent
+NOMINATIM_MIN_INTERVAL = 1.0
+NOMINATIM_USER_AGENT = 'TransportNetworkAnalysis/1.0'
+
+class _RateLimiter:
+    """Space out calls so at most one starts per interval, across threads."""
+    
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+    
+    def wait(self) -> None:
+        """Block until the caller may start its request."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time)
+            self._next_time = start + self.min_interval
+        
+        if start > now:
+            time.sleep(start - now)
+
+_nominatim_limiter = _RateLimiter(NOMINATIM_MIN_INTERVAL)
+
+def _haversine_scalar(lat1, lon1, lat2, lon2):
+    """Haversine distance in kilometers between two scalar points, using the math module."""
+    lat1 = math.radians(lat1)
+    lon1 = math.radians(lon1)
+    lat2 = math.radians(lat2)
+    lon2 = math.radians(lon2)
+    
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+def geocode_location(location_name: str, region: str = "uk",
+                     session: Optional[requests.Session] = None) -> Optional[Dict[str, float]]:
     """
     Geocode a location name to coordinates using Nominatim.
     
     Args:
         location_name: Name of the location to geocode
         region: Region to focus search in
+        session: Optional session to reuse connections across requests
         
     Returns:
         Dictionary with lat/lon or None if geocoding failed
@@ -30,11 +72,14 @@ def geocode_location(location_name: str, region: str = "uk") -> Optional[Dict[st
     
     # Make request with proper headers and rate limiting
     headers = {
-        'User-Agent': 'TransportNetworkAnalysis/1.0'
+        'User-Agent': NOMINATIM_USER_AGENT
     }
     
+    # Be nice to the API - the shared limiter paces requests from all threads
+    _nominatim_limiter.wait()
+    
     try:
-        response = requests.get(url, headers=headers)
+        response = (session or requests).get(url, headers=headers)
         
         if response.status_code == 200:
             results = response.json()
@@ -57,21 +102,87 @@ def geocode_location(location_name: str, region: str = "uk") -> Optional[Dict[st
     except Exception as e:
         logger.error(f"Error geocoding {location_name}: {e}")
     
-    # Be nice to the API - respect rate limits
-    time.sleep(1)
-    
     return None
 
+def _import_json_cache(cache_file: str) -> None:
+    """Seed a new SQLite cache from the legacy JSON cache next to it, if there is one."""
+    json_file = os.path.splitext(cache_file)[0] + '.json'
+    if not os.path.exists(json_file):
+        return
+    
+    with open(json_file, 'r') as f:
+        legacy = json.load(f)
+    
+    _save_cache(cache_file, legacy, legacy)
+    logger.info(f"Imported {len(legacy)} geocoding results from {json_file} into {cache_file}")
+
+def _load_cache(cache_file: str, location_names: List[str]) -> Dict[str, Optional[Dict[str, float]]]:
+    """Load cached results for the given names from a SQLite or legacy JSON cache."""
+    if not cache_file.endswith('.json') and not os.path.exists(cache_file):
+        # First run after the switch to SQLite: keep what the JSON cache resolved
+        _import_json_cache(cache_file)
+    
+    if not os.path.exists(cache_file):
+        return {}
+    
+    if cache_file.endswith('.json'):
+        with open(cache_file, 'r') as f:
+            return json.load(f)
+    
+    # Only read the rows this batch asks for, in chunks below SQLite's variable limit
+    cache = {}
+    con = sqlite3.connect(cache_file)
+    try:
+        con.execute("CREATE TABLE IF NOT EXISTS geocode (name TEXT PRIMARY KEY, lat REAL, lon REAL)")
+        for i in range(0, len(location_names), 500):
+            chunk = location_names[i:i + 500]
+            rows = con.execute(
+                f"SELECT name, lat, lon FROM geocode WHERE name IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for name, lat, lon in rows:
+                cache[name] = None if lat is None else {'lat': lat, 'lon': lon}
+    finally:
+        con.close()
+    
+    return cache
+
+def _save_cache(cache_file: str, cache: Dict[str, Optional[Dict[str, float]]],
+                new_entries: Dict[str, Optional[Dict[str, float]]]) -> None:
+    """Persist new results: one SQLite transaction, or a full rewrite of a legacy JSON cache."""
+    if cache_file.endswith('.json'):
+        with open(cache_file, 'w') as f:
+            json.dump(cache, f)
+        return
+    
+    con = sqlite3.connect(cache_file)
+    try:
+        with con:
+            con.execute("CREATE TABLE IF NOT EXISTS geocode (name TEXT PRIMARY KEY, lat REAL, lon REAL)")
+            con.executemany(
+                "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?)",
+                [(name, coords['lat'] if coords else None, coords['lon'] if coords else None)
+                 for name, coords in new_entries.items()]
+            )
+    finally:
+        con.close()
+
 def batch_geocode(location_names: List[str], 
                  region: str = "uk",
-                 cache_file: str = "geocode_cache.json") -> Dict[str, Dict[str, float]]:
+                 cache_file: str = "geocode_cache.db",
+                 max_workers: int = 4) -> Dict[str, Dict[str, float]]:
     """
     Geocode a batch of location names with caching.
     
+    Cache misses are requested from a thread pool so network latency overlaps
+    with the rate limiter's pacing. Failed lookups are cached as None and not
+    retried by later batches.
+    
     Args:
         location_names: List of location names to geocode
         region: Region to focus search in
-        cache_file: File to cache results
+        cache_file: SQLite file to cache results in (a .json path uses the legacy JSON cache;
+            a missing SQLite file is seeded from the .json file of the same name)
+        max_workers: Number of threads issuing requests
         
     Returns:
         Dictionary mapping location names to coordinates
@@ -80,41 +191,54 @@ def batch_geocode(location_names: List[str],
     
     # Load cache if it exists
     cache = {}
-    if os.path.exists(cache_file):
-        try:
-            with open(cache_file, 'r') as f:
-                cache = json.load(f)
-            logger.info(f"Loaded {len(cache)} cached geocoding results")
-        except Exception as e:
-            logger.warning(f"Failed to load geocoding cache: {e}")
+    try:
+        cache = _load_cache(cache_file, [location for location in dict.fromkeys(location_names) if location])
+        logger.info(f"Loaded {len(cache)} cached geocoding results")
+    except Exception as e:
+        logger.warning(f"Failed to load geocoding cache: {e}")
     
-    # Geocode locations not in cache
-    results = {}
+    # Geocode unique, non-empty locations not in cache
+    misses = [location for location in dict.fromkeys(location_names)
+              if location and location not in cache]
     new_results = 0
+    new_entries = {}
     
-    for location in location_names:
-        # Skip empty location names
-        if not location:
-            continue
-            
-        # Check cache first
-        if location in cache:
-            results[location] = cache[location]
-        else:
-            # Geocode and cache
-            coords = geocode_location(location, region)
-            
-            if coords:
-                results[location] = coords
-                cache[location] = coords
-                new_results += 1
+    if misses:
+        # Sessions keep connections to Nominatim alive across the batch; each
+        # worker thread gets its own since Session is not documented as thread-safe
+        local = threading.local()
+        sessions = []
+        
+        def geocode(location):
+            session = getattr(local, 'session', None)
+            if session is None:
+                session = local.session = requests.Session()
+                sessions.append(session)
+            return geocode_location(location, region, session=session)
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for location, coords in zip(misses, executor.map(geocode, misses)):
+                    # Failures are cached too so repeat batches skip them
+                    new_entries[location] = coords
+                    if coords:
+                        new_results += 1
+        finally:
+            for session in sessions:
+                session.close()
+        cache.update(new_entries)
+    
+    results = {
+        location: cache[location]
+        for location in location_names
+        if location and cache.get(location)
+    }
     
     # Save updated cache
-    if new_results > 0:
+    if new_entries:
         try:
-            with open(cache_file, 'w') as f:
-                json.dump(cache, f)
-            logger.info(f"Saved {len(cache)} geocoding results to cache")
+            _save_cache(cache_file, cache, new_entries)
+            logger.info(f"Saved {len(new_entries)} new geocoding results to cache")
         except Exception as e:
             logger.warning(f"Failed to save geocoding cache: {e}")
     
@@ -150,9 +274,7 @@ def enhance_node_coordinates(G, name_attribute: str = 'name',
     
     # Batch geocode
     location_names = [name for _, name in missing_coords]
-    # Batch geocode
-    location_names = [name for _, name in missing_coords]
-    geocoded = batch_geocode([name for name in location_names], region.split(',')[0])
+    geocoded = batch_geocode(location_names, region.split(',')[0])
     
     # Update node coordinates
     enhanced = 0
@@ -166,6 +288,31 @@ def enhance_node_coordinates(G, name_attribute: str = 'name',
     
     return enhanced
 
+def _build_coord_soa(G) -> Tuple[Dict[Any, int], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Lay node coordinates out as flat arrays.
+    
+    Args:
+        G: NetworkX graph
+        
+    Returns:
+        Tuple of (node -> index map, latitudes, longitudes, mask of nodes with both coordinates)
+    """
+    n = G.number_of_nodes()
+    node_idx = {}
+    lats = np.full(n, np.nan)
+    lons = np.full(n, np.nan)
+    mask = np.zeros(n, dtype=bool)
+    
+    for i, (node, data) in enumerate(G.nodes(data=True)):
+        node_idx[node] = i
+        if 'lat' in data and 'lon' in data:
+            lats[i] = data['lat']
+            lons[i] = data['lon']
+            mask[i] = True
+    
+    return node_idx, lats, lons, mask
+
 def calculate_distances(G, distance_attribute: str = 'distance') -> None:
     """
     Calculate geographic distances between connected nodes.
@@ -176,24 +323,25 @@ def calculate_distances(G, distance_attribute: str = 'distance') -> None:
     """
     logger.info("Calculating geographic distances")
     
-    # Count edges with coordinates
-    edges_with_coords = 0
+    # Read node coordinates once into arrays and index them by edge endpoints
+    node_idx, lats, lons, mask = _build_coord_soa(G)
+    edges = list(G.edges())
+    src = np.fromiter((node_idx[u] for u, _ in edges), dtype=np.intp, count=len(edges))
+    dst = np.fromiter((node_idx[v] for _, v in edges), dtype=np.intp, count=len(edges))
+    
+    # Only edges where both nodes have coordinates
+    with_coords = np.flatnonzero(mask[src] & mask[dst])
+    edges_with_coords = len(with_coords)
     
-    # Calculate distances for all edges where both nodes have coordinates
-    for u, v, data in G.edges(data=True):
-        u_data = G.nodes[u]
-        v_data = G.nodes[v]
+    if edges_with_coords:
+        # Calculate Haversine distances for all edges in one vectorized pass
+        src, dst = src[with_coords], dst[with_coords]
+        distances = haversine_distance(lats[src], lons[src], lats[dst], lons[dst])
         
-        if 'lat' in u_data and 'lon' in u_data and 'lat' in v_data and 'lon' in v_data:
-            # Calculate Haversine distance
-            dist = haversine_distance(
-                u_data['lat'], u_data['lon'],
-                v_data['lat'], v_data['lon']
-            )
-            
-            # Store in edge data
+        # Store in edge data
+        for i, dist in zip(with_coords.tolist(), distances.tolist()):
+            u, v = edges[i]
             G[u][v][distance_attribute] = dist
-            edges_with_coords += 1
     
     logger.info(f"Calculated distances for {edges_with_coords}/{G.number_of_edges()} edges")
 
@@ -202,6 +350,8 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     Calculate the great circle distance between two points 
     on the earth (specified in decimal degrees).
     
+    Also accepts NumPy arrays of coordinates, returning an array of distances.
+    
     Args:
         lat1, lon1: Coordinates of first point
         lat2, lon2: Coordinates of second point
@@ -209,6 +359,10 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     Returns:
         Distance in kilometers
     """
+    # Single points skip the NumPy ufunc overhead
+    if np.isscalar(lat1) and np.isscalar(lon1) and np.isscalar(lat2) and np.isscalar(lon2):
+        return _haversine_scalar(float(lat1), float(lon1), float(lat2), float(lon2))
+    
     # Convert decimal degrees to radians
     lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
     
@@ -4,11 +4,69 @@ Optimization utilities for transport network analysis.
 
 import networkx as nx
 import numpy as np
+import math
+import random
+from collections import defaultdict
 from typing import Dict, Any, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    import igraph
+    IGRAPH_AVAILABLE = True
+except ImportError:
+    IGRAPH_AVAILABLE = False
+
+# Attributes kept by optimize_graph_for_memory
+ESSENTIAL_NODE_ATTRS = frozenset(('name', 'lat', 'lon', 'type'))
+ESSENTIAL_EDGE_ATTRS = frozenset(('route_id', 'route_type', 'trips'))
+
+def sampled_betweenness(G: nx.Graph, k: Optional[int] = None,
+                        seed: Optional[int] = None) -> Dict[Any, float]:
+    """
+    Calculate normalized betweenness centrality from k sampled source nodes.
+    
+    Uses igraph's C implementation when it is installed and falls back to
+    nx.betweenness_centrality otherwise. Sources are drawn with the same
+    random.sample call NetworkX makes, so both give the same scores.
+    
+    Args:
+        G: Undirected NetworkX graph
+        k: Number of source nodes to sample (None uses every node)
+        seed: Optional random seed for the source sample
+        
+    Returns:
+        Dictionary mapping nodes to betweenness centrality
+    """
+    if not IGRAPH_AVAILABLE or G.is_directed():
+        return nx.betweenness_centrality(G, k=k, normalized=True, seed=seed)
+    
+    nodes = list(G.nodes())
+    n = len(nodes)
+    # NetworkX samples from the global generator, or from Random(seed) when seeded
+    rng = random if seed is None else random.Random(seed)
+    sources = nodes if k is None else rng.sample(nodes, k)
+    if n <= 2:
+        return {node: 0.0 for node in nodes}
+    
+    # Brandes accumulates over ordered (source, target) pairs; a mutual
+    # directed graph makes igraph count paths the same way
+    index = {node: i for i, node in enumerate(nodes)}
+    g = igraph.Graph(n=n, edges=[(index[u], index[v]) for u, v in G.edges()]).as_directed(mode='mutual')
+    scores = g.betweenness(directed=True, sources=[index[s] for s in sources])
+    
+    # Rescale as NetworkX does: sampled sources cannot lie on their own paths
+    k = len(sources)
+    scale_source = 1 / ((k - 1) * (n - 2)) if k > 1 else math.nan
+    scale_nonsource = 1 / (k * (n - 2))
+    source_set = set(sources)
+    
+    return {
+        node: score * (scale_source if node in source_set else scale_nonsource)
+        for node, score in zip(nodes, scores)
+    }
+
 def optimize_graph_for_memory(G: nx.Graph) -> nx.Graph:
     """
     Optimize a graph to reduce memory usage.
@@ -25,20 +83,16 @@ def optimize_graph_for_memory(G: nx.Graph) -> nx.Graph:
     G_opt = nx.Graph()
     
     # Copy only essential node attributes
-    essential_node_attrs = ['name', 'lat', 'lon', 'type']
-    
-    for node, data in G.nodes(data=True):
-        # Filter attributes
-        essential_data = {k: v for k, v in data.items() if k in essential_node_attrs}
-        G_opt.add_node(node, **essential_data)
+    G_opt.add_nodes_from(
+        (node, {k: v for k, v in data.items() if k in ESSENTIAL_NODE_ATTRS})
+        for node, data in G.nodes(data=True)
+    )
     
     # Copy only essential edge attributes
-    essential_edge_attrs = ['route_id', 'route_type', 'trips']
-    
-    for u, v, data in G.edges(data=True):
-        # Filter attributes
-        essential_data = {k: v for k, v in data.items() if k in essential_edge_attrs}
-        G_opt.add_edge(u, v, **essential_data)
+    G_opt.add_edges_from(
+        (u, v, {k: val for k, val in data.items() if k in ESSENTIAL_EDGE_ATTRS})
+        for u, v, data in G.edges(data=True)
+    )
     
     logger.info(f"Original graph: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
     logger.info(f"Optimized graph: {G_opt.number_of_nodes()} nodes, {G_opt.number_of_edges()} edges")
@@ -61,13 +115,19 @@ def sample_graph_for_visualization(G: nx.Graph, max_nodes: int = 1000) -> nx.Gra
         
     logger.info(f"Sampling graph for visualization (max {max_nodes} nodes)")
     
+    # Sample node positions rather than node lists; an object array keeps
+    # the original node ids instead of converting them to NumPy scalars
+    rng = np.random.default_rng()
+    n_nodes = G.number_of_nodes()
+    nodes_arr = np.fromiter(G.nodes(), dtype=object, count=n_nodes)
+    
     # Calculate node importance
     try:
         # Try betweenness centrality on a sample
-        sample_nodes = np.random.choice(list(G.nodes()), min(5000, G.number_of_nodes()), replace=False)
-        sample_graph = G.subgraph(sample_nodes)
+        sample_idx = rng.choice(n_nodes, min(5000, n_nodes), replace=False)
+        sample_graph = G.subgraph(nodes_arr[sample_idx])
         
-        centrality = nx.betweenness_centrality(sample_graph, k=100)
+        centrality = sampled_betweenness(sample_graph, k=100)
     except Exception as e:
         logger.warning(f"Failed to calculate betweenness centrality: {e}")
         # Fall back to degree centrality
@@ -77,19 +137,19 @@ def sample_graph_for_visualization(G: nx.Graph, max_nodes: int = 1000) -> nx.Gra
     top_nodes = sorted(centrality.items(), key=lambda x: x[1], reverse=True)[:max_nodes // 2]
     top_node_ids = [n for n, _ in top_nodes]
     
-    # Add random nodes
-    remaining_nodes = list(set(G.nodes()) - set(top_node_ids))
-    if remaining_nodes:
-        random_nodes = np.random.choice(
-            remaining_nodes, 
-            min(max_nodes - len(top_node_ids), len(remaining_nodes)), 
-            replace=False
-        )
-    else:
-        random_nodes = []
+    # Add random nodes, masking out the top nodes by position
+    position = {node: i for i, node in enumerate(nodes_arr)}
+    in_top = np.zeros(n_nodes, dtype=bool)
+    in_top[[position[n] for n in top_node_ids]] = True
+    remaining_idx = np.flatnonzero(~in_top)
+    random_idx = rng.choice(
+        remaining_idx, 
+        min(max_nodes - len(top_node_ids), len(remaining_idx)), 
+        replace=False
+    )
     
     # Create subgraph
-    nodes_to_include = top_node_ids + random_nodes.tolist()
+    nodes_to_include = top_node_ids + nodes_arr[random_idx].tolist()
     subgraph = G.subgraph(nodes_to_include)
     
     logger.info(f"Sampled graph: {subgraph.number_of_nodes()} nodes, {subgraph.number_of_edges()} edges")
@@ -109,30 +169,29 @@ def create_multilayer_network(G: nx.Graph, attribute: str = 'route_type') -> Dic
     """
     logger.info(f"Creating multi-layer network based on '{attribute}'")
     
-    # Collect unique attribute values from edges
-    attribute_values = set()
-    for _, _, data in G.edges(data=True):
+    # Bucket edges by attribute value in a single pass
+    edges_by_value = defaultdict(list)
+    for u, v, data in G.edges(data=True):
         if attribute in data:
-            attribute_values.add(data[attribute])
+            edges_by_value[data[attribute]].append((u, v, data))
+    
+    # Node order in the original graph, so layers list nodes in the same order
+    node_position = {node: i for i, node in enumerate(G.nodes())}
     
     # Create a graph for each layer
     layers = {}
-    for value in attribute_values:
+    for value, edges in edges_by_value.items():
         # Create a new graph
         layer_graph = nx.Graph()
         
-        # Add all nodes
-        for node, data in G.nodes(data=True):
-            layer_graph.add_node(node, **data)
+        # Add only the nodes these edges touch, so the layer has no isolated nodes
+        touched = {n for u, v, _ in edges for n in (u, v)}
+        layer_graph.add_nodes_from(
+            (node, G.nodes[node]) for node in sorted(touched, key=node_position.get)
+        )
         
         # Add edges with matching attribute
-        for u, v, data in G.edges(data=True):
-            if attribute in data and data[attribute] == value:
-                layer_graph.add_edge(u, v, **data)
-        
-        # Remove isolated nodes
-        isolated_nodes = list(nx.isolates(layer_graph))
-        layer_graph.remove_nodes_from(isolated_nodes)
+        layer_graph.add_edges_from(edges)
         
         # Store the layer
         layers[value] = layer_graph
@@ -166,19 +225,22 @@ def find_optimal_paths(G: nx.Graph,
     current_pairs = 0
     
     for source in source_nodes:
+        if current_pairs >= max_pairs:
+            break
+        
+        # One search per source gives the paths to every reachable target
+        if weight:
+            source_paths = nx.single_source_dijkstra_path(G, source, weight=weight)
+        else:
+            source_paths = nx.single_source_shortest_path(G, source)
+        
         for target in target_nodes:
-            if source != target and current_pairs < max_pairs:
-                try:
-                    if weight:
-                        path = nx.shortest_path(G, source, target, weight=weight)
-                    else:
-                        path = nx.shortest_path(G, source, target)
-                        
-                    paths[(source, target)] = path
-                    current_pairs += 1
-                except nx.NetworkXNoPath:
-                    # No path exists
-                    pass
+            if current_pairs >= max_pairs:
+                break
+            # Targets missing from the search have no path
+            if source != target and target in source_paths:
+                paths[(source, target)] = source_paths[target]
+                current_pairs += 1
     
     logger.info(f"Found {len(paths)} paths")
     
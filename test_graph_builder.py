@@ -4,10 +4,14 @@ Test script for the graph builder module.
 
 import os
 import time
+from heapq import nlargest
+from operator import itemgetter
 from dotenv import load_dotenv
-from src.data_processing.gtfs_loader import GTFSLoader
-from src.graph_analysis.graph_builder import TransportGraphBuilder
+import matplotlib
+matplotlib.use("Agg")  # Render straight to file without a GUI backend
 import matplotlib.pyplot as plt
+from tests._support import load_gtfs_data
+from src.graph_analysis.graph_builder import TransportGraphBuilder
 import networkx as nx
 
 # Load environment variables
@@ -18,16 +22,9 @@ def main():
     gtfs_url = os.getenv("GTFS_URL")
     data_dir = os.getenv("DATA_DIR")
     
-    # Create GTFS loader
-    loader = GTFSLoader(gtfs_url, data_dir)
-    
-    # Check if data already exists, otherwise download it
-    if not os.path.exists(os.path.join(data_dir, "stops.txt")):
-        print("Downloading GTFS data...")
-        gtfs_data = loader.process()
-    else:
-        print("Loading existing GTFS data...")
-        gtfs_data = loader.load_data()
+    # Load GTFS data, downloading it if needed
+    print("Loading GTFS data...")
+    gtfs_data = load_gtfs_data(gtfs_url, data_dir)
     
     # Build graph from a sample of trips
     print("\nBuilding transport network graph...")
@@ -50,26 +47,27 @@ def main():
     print("\nVisualizing a subset of the graph (this might take a moment)...")
     
     # Take a subgraph of the 100 highest degree nodes for visualization
-    degrees = dict(G.degree())
-    top_nodes = sorted(degrees, key=degrees.get, reverse=True)[:100]
+    top_nodes = [node for node, _ in nlargest(100, G.degree(), key=itemgetter(1))]
     subgraph = G.subgraph(top_nodes)
     
     plt.figure(figsize=(12, 10))
     
     # Use geographical coordinates for node positions
-    pos = {}
-    for node in subgraph.nodes():
-        node_data = G.nodes[node]
-        pos[node] = (node_data['lon'], node_data['lat'])
+    pos = {node: (data['lon'], data['lat']) for node, data in subgraph.nodes(data=True)}
     
-    # Draw the subgraph
-    nx.draw_networkx(
+    # Draw the subgraph; edges are rasterized so only nodes stay vector
+    edges = nx.draw_networkx_edges(
+        subgraph, 
+        pos=pos,
+        edge_color='gray',
+        alpha=0.7
+    )
+    edges.set_rasterized(True)
+    nx.draw_networkx_nodes(
         subgraph, 
         pos=pos,
-        with_labels=False,
         node_size=50,
         node_color='lightblue',
-        edge_color='gray',
         alpha=0.7
     )
     
@@ -78,7 +76,7 @@ def main():
     plt.tight_layout()
     
     # Save the visualization
-    plt.savefig("transport_network_subset.png", dpi=300)
+    plt.savefig("transport_network_subset.png", dpi=150)
     print("Visualization saved to transport_network_subset.png")
     
 if __name__ == "__main__":
@@ -4,7 +4,7 @@ Test script for the GTFS loader module.
 
 import os
 from dotenv import load_dotenv
-from src.data_processing.gtfs_loader import GTFSLoader
+from tests._support import load_gtfs_data
 
 # Load environment variables
 load_dotenv()
@@ -17,21 +17,18 @@ def main():
     print(f"GTFS URL: {gtfs_url}")
     print(f"Data directory: {data_dir}")
     
-    # Create GTFS loader
-    loader = GTFSLoader(gtfs_url, data_dir)
-    
     # Download and load data
-    gtfs_data = loader.process()
+    gtfs_data = load_gtfs_data(gtfs_url, data_dir)
     
     # Print information about loaded data
     print("\nLoaded GTFS data:")
     for name, df in gtfs_data.items():
-        print(f"- {name}: {len(df)} rows, {df.columns.tolist()}")
+        print(f"- {name}: {len(df)} rows, columns: {', '.join(df.columns)}")
     
     # Print a sample of stops data
     if 'stops' in gtfs_data:
         print("\nSample stops data:")
-        print(gtfs_data['stops'].head())
+        print(gtfs_data['stops'].head().to_string())
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
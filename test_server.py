@@ -4,19 +4,32 @@ Test server to verify network connectivity issues
 
 import socket
 import http.server
-import socketserver
 import threading
-import time
 import webbrowser
 
+# Page served for every request, encoded once
+RESPONSE_BYTES = b"""
+            <!DOCTYPE html>
+            <html>
+            <head>
+                <title>Test Server</title>
+            </head>
+            <body>
+                <h1>Test Server is Working!</h1>
+                <p>If you can see this page, the HTTP server is working correctly.</p>
+            </body>
+            </html>
+            """
+
 def check_port_binding():
     try:
-        # Try to bind to the port
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.bind(('127.0.0.1', 8060))
-        s.close()
+        # Try to bind to the port; SO_REUSEADDR matches the server's own
+        # bind, so a lingering TIME_WAIT socket isn't reported as in use
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            s.bind(('127.0.0.1', 8060))
         return True
-    except:
+    except OSError:
         return False
 
 def simple_http_server():
@@ -25,19 +38,9 @@ def simple_http_server():
         def do_GET(self):
             self.send_response(200)
             self.send_header('Content-type', 'text/html')
+            self.send_header('Content-Length', str(len(RESPONSE_BYTES)))
             self.end_headers()
-            self.wfile.write(b"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Test Server</title>
-            </head>
-            <body>
-                <h1>Test Server is Working!</h1>
-                <p>If you can see this page, the HTTP server is working correctly.</p>
-            </body>
-            </html>
-            """)
+            self.wfile.write(RESPONSE_BYTES)
             print("Someone connected to the server!")
     
     # Try different host addresses
@@ -48,21 +51,27 @@ def simple_http_server():
         ('0.0.0.0', port)
     ]
     
-    # Try each handler configuration
+    # Bind to the first host configuration that works
+    httpd = None
     for host, port in handlers:
         try:
             # Try to start with this configuration
             print(f"\nAttempting to start server on {host}:{port}")
-            
-            with socketserver.TCPServer((host, port), SimpleHandler) as httpd:
-                print(f"Server started successfully on {host}:{port}")
-                print(f"Try opening: http://{host}:{port}")
-                print("Press Ctrl+C to stop the server")
-                httpd.serve_forever()
-                
-        except Exception as e:
+            httpd = http.server.ThreadingHTTPServer((host, port), SimpleHandler)
+            break
+        except OSError as e:
             print(f"Failed to start server on {host}:{port}: {e}")
-            continue
+    
+    if httpd is None:
+        print("Could not start the server on any address")
+        return
+    
+    # Serve requests on a thread per connection until interrupted
+    with httpd:
+        print(f"Server started successfully on {host}:{port}")
+        print(f"Try opening: http://{host}:{port}")
+        print("Press Ctrl+C to stop the server")
+        httpd.serve_forever()
 
 if __name__ == "__main__":
     print("Testing network connectivity...")
@@ -73,12 +82,11 @@ if __name__ == "__main__":
     else:
         print("Port binding test failed - port 8060 is already in use!")
     
-    # Try to open a browser automatically (may not work in all environments)
-    try:
-        # Start the server in a separate thread so we can open the browser
-        threading.Thread(target=lambda: time.sleep(1) and webbrowser.open("http://127.0.0.1:8060")).start()
-    except:
-        pass
+    # Try to open a browser automatically (may not work in all environments),
+    # giving the server a second to start first
+    browser_timer = threading.Timer(1.0, webbrowser.open, args=("http://127.0.0.1:8060",))
+    browser_timer.daemon = True
+    browser_timer.start()
     
     # Start the server
     simple_http_server()
\ No newline at end of file
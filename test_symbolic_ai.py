@@ -3,89 +3,111 @@ Test script for the symbolic AI component.
 """
 
 import os
-import networkx as nx
+import pickle
+import hashlib
 from dotenv import load_dotenv
-from src.data_processing.gtfs_loader import GTFSLoader
-from src.graph_analysis.graph_builder import TransportGraphBuilder
 from src.graph_analysis.community_detection import CommunityDetector
 from src.symbolic_ai.knowledge_base import TransportKnowledgeBase
+from tests._support import load_or_build, load_sample_network
 
 # Load environment variables
 load_dotenv()
 
+def _cached_kb(kb_creator, G, partition, data_dir, max_critical_nodes=50,
+               sample_size=500, seed=42):
+    """Create the knowledge base, reusing a cached one for the same network."""
+    # The betweenness sample is seeded, so a cache hit matches a fresh build
+    def build():
+        kb = kb_creator.create_knowledge_base(max_critical_nodes=max_critical_nodes,
+                                              sample_size=sample_size, seed=seed)
+        return kb, kb_creator.symbols
+    
+    partition_digest = hashlib.blake2b(
+        pickle.dumps(sorted(partition.items()), protocol=pickle.HIGHEST_PROTOCOL),
+        digest_size=16
+    ).hexdigest()
+    kb, symbols = load_or_build(
+        "kb", data_dir, build,
+        partition=partition_digest,
+        num_edges=G.number_of_edges(),
+        max_critical_nodes=max_critical_nodes,
+        sample_size=sample_size,
+        seed=seed
+    )
+    
+    # Reasoning reads the knowledge base from the creator, so restore it on a hit
+    kb_creator.kb = kb
+    kb_creator.symbols = symbols
+    return kb
+
 def main():
     # Get configuration from environment variables
     gtfs_url = os.getenv("GTFS_URL")
     data_dir = os.getenv("DATA_DIR")
     
-    # Load GTFS data
-    print("Loading GTFS data...")
-    loader = GTFSLoader(gtfs_url, data_dir)
-    
-    # Check if data already exists, otherwise download it
-    if not os.path.exists(os.path.join(data_dir, "stops.txt")):
-        gtfs_data = loader.process()
-    else:
-        gtfs_data = loader.load_data()
-    
-    # Build graph from a sample of trips
-    print("\nBuilding transport network graph...")
-    builder = TransportGraphBuilder(gtfs_data)
-    G = builder.build_graph(sample_size=1000)  # Sample for faster testing
-    
-    # Detect communities
-    print("\nDetecting communities...")
-    detector = CommunityDetector(G)
-    partition = detector.detect_communities_louvain()
+    # Load the shared sampled network and its communities
+    print("Loading transport network graph...")
+    G, partition = load_sample_network(gtfs_url, data_dir, sample_size=1000, seed=42)
     
     # Identify critical nodes
     print("\nIdentifying critical nodes...")
+    detector = CommunityDetector(G)
+    detector.partition = partition
     critical_nodes = detector.identify_critical_nodes(top_n=20)
     
     # Create symbolic knowledge base
     print("\nCreating symbolic knowledge base...")
     kb_creator = TransportKnowledgeBase(G, partition)
-    kb = kb_creator.create_knowledge_base(max_critical_nodes=50)
+    kb = _cached_kb(kb_creator, G, partition, data_dir, max_critical_nodes=50,
+                    sample_size=500, seed=42)
     
-    # Print knowledge base statistics
-    print("\nKnowledge Base Statistics:")
-    print(f"Communities: {len(kb['communities'])}")
-    print(f"Critical nodes: {len(kb['nodes'])}")
-    print(f"Membership rules: {len(kb['membership_rules'])}")
-    print(f"Connectivity rules: {len(kb['connectivity_rules'])}")
-    print(f"Community connectivity rules: {len(kb['community_connectivity_rules'])}")
+    # Print knowledge base statistics; each section is collected and
+    # written in one go
+    print(
+        "\nKnowledge Base Statistics:",
+        f"Communities: {len(kb['communities'])}",
+        f"Critical nodes: {len(kb['nodes'])}",
+        f"Membership rules: {len(kb['membership_rules'])}",
+        f"Connectivity rules: {len(kb['connectivity_rules'])}",
+        f"Community connectivity rules: {len(kb['community_connectivity_rules'])}",
+        sep='\n'
+    )
     
     # Perform symbolic reasoning
     print("\nPerforming symbolic reasoning...")
-    results = kb_creator.perform_symbolic_reasoning(critical_nodes)
+    results = kb_creator.perform_symbolic_reasoning(critical_nodes, gateway_top=10, dep_top=5, vuln_top=5)
     
     # Print gateway nodes (nodes connecting multiple communities)
-    print("\nTop Gateway Nodes (connecting multiple communities):")
+    lines = ["\nTop Gateway Nodes (connecting multiple communities):"]
     for i, (node_id, data) in enumerate(results['gateway_nodes'][:10], 1):
-        print(f"{i}. {data['name']} (Community {data['community']}):")
-        print(f"   Connects to {data['num_communities']} communities: {data['connected_communities']}")
+        lines.append(f"{i}. {data['name']} (Community {data['community']}):")
+        lines.append(f"   Connects to {data['num_communities']} communities: {data['connected_communities']}")
+    print(*lines, sep='\n')
     
     # Print community dependencies
-    print("\nCommunity Dependencies:")
+    lines = ["\nCommunity Dependencies:"]
     for i, (comm_id, data) in enumerate(results['community_dependencies'][:5], 1):
-        print(f"{i}. Community {comm_id}:")
-        print(f"   Connected to {data['num_connections']} communities: {data['connected_to']}")
+        lines.append(f"{i}. Community {comm_id}:")
+        lines.append(f"   Connected to {data['num_connections']} communities: {data['connected_to']}")
+    print(*lines, sep='\n')
     
     # Print network vulnerabilities
-    print("\nNetwork Vulnerabilities:")
+    lines = ["\nNetwork Vulnerabilities:"]
     for i, vuln in enumerate(results['vulnerabilities'][:5], 1):
-        print(f"{i}. {vuln['name']} (Community {vuln['community']}):")
-        print(f"   Impact if removed: Would affect {vuln['impact']} communities")
-        print(f"   Affected communities: {vuln['affected_communities']}")
+        lines.append(f"{i}. {vuln['name']} (Community {vuln['community']}):")
+        lines.append(f"   Impact if removed: Would affect {vuln['impact']} communities")
+        lines.append(f"   Affected communities: {vuln['affected_communities']}")
+    print(*lines, sep='\n')
     
     # Generate sample logical queries
-    print("\nSample Logical Queries:")
     queries = kb_creator.generate_logical_queries()
     
+    lines = ["\nSample Logical Queries:"]
     for i, query in enumerate(queries, 1):
-        print(f"{i}. {query['name']}: {query['description']}")
-        print(f"   Query: {query['query']}")
-        print(f"   Result: {query['result']}")
+        lines.append(f"{i}. {query['name']}: {query['description']}")
+        lines.append(f"   Query: {query['query']}")
+        lines.append(f"   Result: {query['result']}")
+    print(*lines, sep='\n')
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,154 @@
+"""
+Shared setup for the test scripts.
+Loads GTFS data, builds the sampled network they all start from, and caches
+expensive artifacts on disk between runs.
+"""
+
+import os
+import pickle
+import hashlib
+from functools import lru_cache
+from typing import Dict, Tuple, Any, Callable
+import networkx as nx
+import pandas as pd
+import logging
+
+from src.data_processing.gtfs_loader import EnhancedGTFSLoader
+from src.graph_analysis.graph_builder import TransportGraphBuilder
+from src.graph_analysis.community_detection import CommunityDetector
+
+logger = logging.getLogger(__name__)
+
+# GTFS files the graph is built from; a change to any of them invalidates the cache
+GTFS_SOURCE_FILES = ('stops.txt', 'routes.txt', 'trips.txt', 'stop_times.txt')
+
+def _source_fingerprint(data_dir: str) -> Any:
+    """
+    Describe the GTFS source files by modification time and size.
+    
+    Args:
+        data_dir: Directory containing the GTFS files
+    
+    Returns:
+        Tuple of (file name, mtime_ns, size) entries, or None if the data is missing
+    """
+    fingerprint = []
+    for name in GTFS_SOURCE_FILES:
+        path = os.path.join(data_dir, name)
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        fingerprint.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+def load_or_build(name: str, data_dir: str, build: Callable[[], Any],
+                  cache_dir: str = ".cache", **params) -> Any:
+    """
+    Load a cached artifact, or build and cache it on a miss.
+    
+    The cache key covers the GTFS source files and any keyword parameters, so
+    new data or different settings trigger a rebuild. Only cache artifacts
+    that are fully determined by those inputs.
+    
+    Args:
+        name: Name of the artifact, used in the cache file name
+        data_dir: Directory containing the GTFS files the artifact derives from
+        build: Zero-argument callable producing the artifact
+        cache_dir: Directory to store cache files in
+        **params: Settings the artifact depends on (e.g. sample_size)
+    
+    Returns:
+        The cached or freshly built artifact
+    """
+    fingerprint = _source_fingerprint(data_dir)
+    if fingerprint is None:
+        # Nothing to key on until the data has been downloaded
+        logger.info(f"GTFS data not found in {data_dir}, building {name} without cache")
+        return build()
+    
+    key = repr((fingerprint, sorted(params.items()))).encode()
+    digest = hashlib.blake2b(key, digest_size=8).hexdigest()
+    cache_file = os.path.join(cache_dir, f"{name}_{digest}.pkl")
+    
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                artifact = pickle.load(f)
+            logger.info(f"Loaded cached {name} from {cache_file}")
+            return artifact
+        except Exception as e:
+            logger.warning(f"Failed to load cached {name}: {e}")
+    
+    artifact = build()
+    
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_file, 'wb') as f:
+            pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+        logger.info(f"Saved {name} to {cache_file}")
+    except Exception as e:
+        logger.warning(f"Failed to save cached {name}: {e}")
+    
+    return artifact
+
+@lru_cache(maxsize=None)
+def gtfs_present(data_dir: str) -> bool:
+    """Check whether GTFS data has been extracted into data_dir."""
+    return os.path.exists(os.path.join(data_dir, "stops.txt"))
+
+def load_gtfs_data(gtfs_url: str, data_dir: str) -> Dict[str, pd.DataFrame]:
+    """
+    Load GTFS data, downloading it first if it isn't available locally.
+    
+    Args:
+        gtfs_url: URL to download the GTFS data from
+        data_dir: Directory the GTFS data is stored in
+    
+    Returns:
+        Dictionary mapping GTFS file names to pandas DataFrames
+    """
+    present = gtfs_present(data_dir)
+    if not present:
+        logger.info("Downloading GTFS data...")
+    else:
+        logger.info("Loading existing GTFS data...")
+    
+    # process() skips the download when the data already exists
+    gtfs_data = EnhancedGTFSLoader(gtfs_url, data_dir).process()
+    
+    if not present:
+        # The download just created the data, so the cached answer is stale
+        gtfs_present.cache_clear()
+    
+    return gtfs_data
+
+def load_sample_network(gtfs_url: str, data_dir: str, sample_size: int = 1000,
+                        seed: int = 42) -> Tuple[nx.Graph, Dict[Any, int]]:
+    """
+    Build the sampled transport graph and its communities, cached on disk.
+    
+    Scripts that call this with the same data, sample size and seed share one
+    cached build instead of each loading GTFS data and running Louvain.
+    
+    Args:
+        gtfs_url: URL to download the GTFS data from
+        data_dir: Directory the GTFS data is stored in
+        sample_size: Number of trips to sample for graph construction
+        seed: Seed for both the trip sample and Louvain, so the cached
+              network is the one a fresh build would produce
+    
+    Returns:
+        Tuple of (graph, partition)
+    """
+    def build():
+        gtfs_data = load_gtfs_data(gtfs_url, data_dir)
+        G = TransportGraphBuilder(gtfs_data).build_graph(sample_size=sample_size, seed=seed)
+        partition = CommunityDetector(G).detect_communities_louvain(seed=seed)
+        return G, partition
+    
+    return load_or_build(
+        "sample_network", data_dir, build,
+        sample_size=sample_size,
+        seed=seed,
+        louvain_backend=os.environ.get("LOUVAIN_BACKEND", "nx")
+    )